@@ -0,0 +1,87 @@
+import hashlib
+import json
+import os
+
+from metrics import metrics
+
+# Default location of the on-disk model answer cache shared by gemini.py and gpt.py
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".answer_cache")
+
+
+# Function to compute the cache key of a model answer
+def answer_key(provider, model, template, gene, context):
+    digest = hashlib.sha256()
+    for part in (provider, model, template, gene, context):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+# On-disk cache of model answers, one JSON file per answer_key. Unlike the
+# study cache it never expires: an answer only changes when one of the key
+# parts does, or when it is invalidated explicitly.
+class AnswerCache:
+    def __init__(self, cache_dir=CACHE_DIR):
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    # Return the cached answer, or None on a miss
+    def get(self, provider, model, template, gene, context):
+        try:
+            with open(self._path(answer_key(provider, model, template, gene, context)), encoding="utf-8") as f:
+                answer = json.load(f)["answer"]
+        except (OSError, ValueError, KeyError):
+            self.misses += 1
+            metrics.count("answer_cache_misses")
+            return None
+        self.hits += 1
+        metrics.count("answer_cache_hits")
+        return answer
+
+    # Tell whether an answer is cached, without counting a hit or a miss
+    def contains(self, provider, model, template, gene, context):
+        return os.path.exists(self._path(answer_key(provider, model, template, gene, context)))
+
+    def put(self, provider, model, template, gene, context, answer):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._path(answer_key(provider, model, template, gene, context))
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"provider": provider, "model": model, "gene": gene, "answer": answer}, f)
+        os.replace(tmp_path, path)
+
+    # Remove cached answers; filters that are given must all match.
+    # Returns the number of entries removed.
+    def invalidate(self, provider=None, model=None, gene=None):
+        try:
+            names = [name for name in os.listdir(self.cache_dir) if name.endswith(".json")]
+        except OSError:
+            return 0
+
+        removed = 0
+        for name in names:
+            path = os.path.join(self.cache_dir, name)
+            try:
+                with open(path, encoding="utf-8") as f:
+                    entry = json.load(f)
+            except (OSError, ValueError):
+                entry = {}
+            if provider is not None and entry.get("provider") != provider:
+                continue
+            if model is not None and entry.get("model") != model:
+                continue
+            if gene is not None and entry.get("gene") != gene:
+                continue
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError:
+                pass
+        return removed
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses}
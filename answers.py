@@ -0,0 +1,161 @@
+import json
+import re
+
+from answer_cache import AnswerCache
+from batch import run_batch
+from dispatch import RateBudget, run_job
+from eligibility import fit_context
+from metrics import metrics
+from prescreen import rule_answer
+from retry import default_policy
+
+# Asks about one gene; the reply leads with its verdict so reports can read it
+QUESTION_TEMPLATE = (
+    "Based on the following clinical trial information, would a patient with a {gene} gene mutation be eligible "
+    'for the clinical trial? Start your answer with "Yes", "No" or "Unclear", then explain.'
+)
+
+# Asks about every gene a trial is listed under in one call
+MULTI_GENE_TEMPLATE = (
+    "Based on the following clinical trial information, would a patient with a gene mutation in each of "
+    "the following genes be eligible for the clinical trial? Genes: {genes}. Reply only with a JSON object "
+    'mapping each gene to an object with "eligible" ("yes", "no" or "unclear") and "explanation".'
+)
+
+# Cache shared by every script in this folder
+answer_cache = AnswerCache()
+
+
+# Function to return the template part of an answer cache key; providers that
+# add their own framing to the prompt (e.g. a system prompt) contribute it here
+def cache_template(provider, template):
+    return f"{provider.prompt_signature}\n{template}" if provider.prompt_signature else template
+
+
+# Function to return the context actually sent to `provider`: trimmed to the
+# provider's token budget with its own tokenizer
+def prompt_context(provider, document_context):
+    return fit_context(document_context, provider.context_tokens, provider.count_tokens)
+
+
+# Function to count the prompt tokens a question and its context cost with
+# `provider`, including its own framing (e.g. the OpenAI system prompt)
+def prompt_tokens(provider, question, context):
+    return sum(provider.count_tokens(part) for part in (provider.prompt_signature, question, context) if part)
+
+
+# Function to split a multi-gene reply into one answer per gene
+def parse_multi_gene_answer(text, genes):
+    match = re.search(r"\{.*\}", text, re.S)
+    if match is None:
+        raise ValueError(f"No JSON object in multi-gene answer: {text[:200]!r}")
+    verdicts = {key.upper(): value for key, value in json.loads(match.group(0)).items()}
+
+    answers = {}
+    for gene in genes:
+        verdict = verdicts.get(gene.upper())
+        if verdict is None:
+            raise ValueError(f"Multi-gene answer has no verdict for {gene}")
+        if isinstance(verdict, dict):
+            answers[gene] = f"Eligible: {verdict.get('eligible', 'unclear')}\n{verdict.get('explanation', '')}".rstrip()
+        else:
+            answers[gene] = str(verdict)
+    return answers
+
+
+# Function to build the question for one gene, or for a list of genes at once
+def build_question(gene):
+    if isinstance(gene, str):
+        return QUESTION_TEMPLATE.format(gene=gene)
+    return MULTI_GENE_TEMPLATE.format(genes=", ".join(gene))
+
+
+# Function to parse a reply to build_question(gene): the text itself for one
+# gene, {gene: answer} for a list of genes
+def parse_answer(gene, text):
+    return text if isinstance(gene, str) else parse_multi_gene_answer(text, gene)
+
+
+# Function to generate question and answer. `gene` may also be a list of genes,
+# in which case the answer is {gene: answer} from a single model call.
+async def generate_question_and_answer(provider, gene, document_context):
+    question = build_question(gene)
+    answer = await provider.generate_async(question, document_context)
+    return question, parse_answer(gene, answer)
+
+
+# Function to answer one trial: the cached answer if there is one, otherwise one
+# model call within `budget`. With `genes` the call covers all of them and
+# every gene's answer is cached. With `prescreen`, trials the local
+# pre-screen can decide are answered by its rules instead. Returns
+# (question, answer); answer is None when the model call failed.
+async def answer_trial(provider, gene, document_context, genes=None, cache=answer_cache, budget=None,
+                       policy=default_policy, prescreen=False):
+    question = QUESTION_TEMPLATE.format(gene=gene)
+    if prescreen:
+        answer = rule_answer(gene, document_context)
+        if answer is not None:
+            return question, answer
+    template = cache_template(provider, MULTI_GENE_TEMPLATE if genes else QUESTION_TEMPLATE)
+    with metrics.timer("prompt"):
+        document_context = prompt_context(provider, document_context)
+    answer = cache.get(provider.name, provider.model, template, gene, document_context)
+    if answer is not None:
+        return question, answer
+
+    asked = sorted(set(genes) | {gene}) if genes else gene
+    tokens = prompt_tokens(provider, build_question(asked), document_context)
+    try:
+        _, answer = await run_job(generate_question_and_answer, (provider, asked, document_context),
+                                  budget or RateBudget(), tokens, policy)
+    except Exception as e:
+        print(f"Model call failed for {gene}, {e}")
+        return question, None
+
+    if isinstance(answer, str):
+        answer = {gene: answer}
+    for answered_gene, text in answer.items():
+        cache.put(provider.name, provider.model, template, answered_gene, document_context, text)
+    return question, answer[gene]
+
+
+# Function to answer every trial of a gene in batch mode, serving cached
+# answers and sending the rest to the model as one batch job. With trial_genes
+# (the genes each context is listed under) every trial is asked about all of
+# its genes in one call and the other genes' answers are cached for their own
+# gene lists. With `prescreen` only trials the local pre-screen cannot decide
+# go to the model. Returns one (question, answer) pair per context; answer is
+# None when the model call failed.
+def batch_questions_and_answers(provider, gene, document_contexts, trial_genes=None, cache=answer_cache,
+                                prescreen=False):
+    question = QUESTION_TEMPLATE.format(gene=gene)
+    template = cache_template(provider, MULTI_GENE_TEMPLATE if trial_genes else QUESTION_TEMPLATE)
+    rules = [rule_answer(gene, context) if prescreen else None for context in document_contexts]
+    with metrics.timer("prompt"):
+        document_contexts = [prompt_context(provider, context) for context in document_contexts]
+    results = [(question, rule if rule is not None
+                else cache.get(provider.name, provider.model, template, gene, context))
+               for rule, context in zip(rules, document_contexts)]
+    pending = [i for i, (_, answer) in enumerate(results) if answer is None]
+    asked = [sorted(set(trial_genes[i]) | {gene}) if trial_genes else gene for i in pending]
+
+    replies = run_batch(provider, [(build_question(g), document_contexts[i]) for g, i in zip(asked, pending)],
+                        f"{provider.name}_{gene}")
+    answers = []
+    for g, reply in zip(asked, replies):
+        try:
+            answers.append(reply if isinstance(reply, Exception) else parse_answer(g, reply))
+        except ValueError as e:
+            answers.append(e)
+
+    for i, answer in zip(pending, answers):
+        if isinstance(answer, Exception):
+            print(f"Model call failed for {gene}, {answer}")
+            continue
+        if isinstance(answer, str):
+            answer = {gene: answer}
+        for answered_gene, text in answer.items():
+            cache.put(provider.name, provider.model, template, answered_gene, document_contexts[i], text)
+        results[i] = (question, answer[gene])
+
+    return results
@@ -0,0 +1,63 @@
+import json
+import os
+import time
+
+# Default location of batch input files and polling settings
+BATCH_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".batch_jobs")
+POLL_INTERVAL = 30  # seconds between status checks
+BATCH_TIMEOUT = 24 * 60 * 60  # seconds, the provider's completion window
+
+TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+
+# Function to write a provider batch input file with one request per (prompt, context) job
+def write_batch_file(provider, jobs, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        for i, (prompt, context) in enumerate(jobs):
+            f.write(json.dumps(provider.batch_request(f"request-{i}", prompt, context)) + "\n")
+
+
+# Function to poll a batch job until it reaches a terminal status
+def wait_for_batch(provider, batch_id, poll_interval=POLL_INTERVAL, timeout=BATCH_TIMEOUT):
+    started = time.monotonic()
+    while True:
+        status, output_file_id, error_file_id = provider.batch_status(batch_id)
+        if status in TERMINAL_STATUSES:
+            return status, output_file_id, error_file_id
+        if time.monotonic() - started > timeout:
+            return status, None, None
+        time.sleep(poll_interval)
+
+
+# Function to answer every (prompt, context) job through the provider's batch
+# API instead of interactive calls. Returns a list aligned with jobs holding
+# either the answer or the exception explaining why it is missing.
+def run_batch(provider, jobs, name, batch_dir=BATCH_DIR, poll_interval=POLL_INTERVAL):
+    if not jobs:
+        return []
+    if not hasattr(provider, "submit_batch"):
+        raise ValueError(f"Provider {provider.name} does not support batch mode")
+
+    path = os.path.join(batch_dir, f"{name}_{int(time.time())}.jsonl")
+    write_batch_file(provider, jobs, path)
+    batch_id = provider.submit_batch(path)
+    print(f"Submitted batch {batch_id} with {len(jobs)} requests")
+
+    status, output_file_id, error_file_id = wait_for_batch(provider, batch_id, poll_interval)
+    results = [RuntimeError(f"batch {batch_id} ended with status {status}")] * len(jobs)
+
+    for file_id in (output_file_id, error_file_id):
+        if not file_id:
+            continue
+        for line in provider.batch_file(file_id).splitlines():
+            if not line.strip():
+                continue
+            result = json.loads(line)
+            i = int(result["custom_id"].split("-")[-1])
+            try:
+                results[i] = provider.batch_answer(result)
+            except Exception as e:
+                results[i] = e
+
+    return results
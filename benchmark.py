@@ -0,0 +1,424 @@
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import answers
+import clinicaltrials
+import eligibility
+import pipeline
+from answers import build_question, prompt_context
+from clinicaltrials import extract_nct_id_from_url
+from dispatch import estimate_tokens
+from documents import get_template, write_trial_document, write_trial_document_docx
+from eligibility import extract_eligibility_context
+from metrics import metrics
+
+# Eligibility criteria sizes of the synthetic corpus, in bytes
+CRITERIA_SIZES = [1000, 10000, 100000]
+
+# A trial of roughly the size a real eligibility context has
+SAMPLE_ENTRY = {
+    "Title": "A Phase II Study of Targeted Therapy in Patients With Advanced Solid Tumors",
+    "Link": "https://clinicaltrials.gov/study/NCT00000000",
+    "AllInfo": "Sex: ALL\nEligibility criteria:\nInclusion Criteria:\n" + "- Measurable disease per RECIST 1.1\n" * 60,
+}
+SAMPLE_QUESTION = "Can a patient with a KRAS mutation participate in this clinical trial?"
+SAMPLE_ANSWER = "Yes. The criteria do not exclude KRAS mutations.\nReasoning: ..." * 4
+
+_CRITERIA_LINES = [
+    "Histologically or cytologically confirmed advanced solid tumor",
+    "Documented {gene} mutation by a CLIA-certified laboratory",
+    "Age \\>= 18 years",
+    "ECOG performance status 0\\-1",
+    "Adequate organ function:",
+    "  * Absolute neutrophil count \\>= 1.5 x 10^9/L",
+    "  * Total bilirubin \\<= 1.5 x ULN",
+    "Prior treatment with a {gene} inhibitor",
+    "Known active central nervous system metastases",
+    "Pregnant or breast-feeding women",
+]
+
+
+# Function to build a study shaped like a ClinicalTrials.gov v2 payload whose
+# eligibilityCriteria is about `criteria_bytes` long
+def synthetic_study(number, criteria_bytes, seed=0):
+    rng = random.Random(seed * 1000003 + number)
+    gene = rng.choice(["ALK", "BRAF", "EGFR", "HER2", "KIT", "KRAS"])
+    sections = []
+    for heading in ("Inclusion Criteria:", "Exclusion Criteria:"):
+        lines = [heading, ""]
+        size = len(heading)
+        while size < criteria_bytes // 2:
+            line = "* " + rng.choice(_CRITERIA_LINES).format(gene=gene) if rng.random() < 0.8 else \
+                "  " + rng.choice(_CRITERIA_LINES).format(gene=gene).lstrip()
+            lines.append(line)
+            size += len(line) + 1
+        sections.append("\n".join(lines))
+    nct_id = f"NCT{number:08d}"
+    return {
+        "protocolSection": {
+            "identificationModule": {"nctId": nct_id, "briefTitle": f"Synthetic {gene} trial {number}"},
+            "statusModule": {"overallStatus": "RECRUITING", "lastUpdatePostDateStruct": {"date": "2024-01-01"}},
+            "descriptionModule": {"briefSummary": "A synthetic study used for benchmarking. " * 20},
+            "eligibilityModule": {
+                "eligibilityCriteria": "\n\n".join(sections),
+                "healthyVolunteers": False,
+                "sex": "ALL",
+                "minimumAge": "18 Years",
+                "stdAges": ["ADULT", "OLDER_ADULT"],
+            },
+        },
+    }
+
+
+# Function to build a corpus of `count` studies cycling through `sizes`
+def synthetic_corpus(count, sizes=CRITERIA_SIZES, seed=0):
+    return {f"NCT{number:08d}": synthetic_study(number, sizes[number % len(sizes)], seed)
+            for number in range(1, count + 1)}
+
+
+# Local stand-in for the v2 API serving a synthetic corpus: single-study GETs
+# and /studies list queries, each after `latency` seconds
+class StubServer:
+    def __init__(self, studies, latency=0.0):
+        self.studies = studies
+        self.latency = latency
+
+    def __enter__(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                name = url.path.rsplit("/", 1)[-1]
+                time.sleep(stub.latency)
+                if name == "studies":
+                    ids = parse_qs(url.query).get("filter.ids", [""])[0].split(",")
+                    payload = {"studies": [stub.studies[i] for i in ids if i in stub.studies]}
+                elif name in stub.studies:
+                    payload = stub.studies[name]
+                else:
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_port}/studies"
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+# Provider that answers after `latency` seconds without calling any model
+class FakeModel:
+    name = "fake"
+    model = "fake"
+    prompt_signature = ""
+
+    def __init__(self, latency=0.0, context_tokens=eligibility.CONTEXT_TOKENS):
+        self.latency = latency
+        self.context_tokens = context_tokens
+
+    def count_tokens(self, text):
+        return estimate_tokens(text)
+
+    def generate(self, prompt, context=None):
+        time.sleep(self.latency)
+        return "Unclear. Synthetic answer."
+
+    async def generate_async(self, prompt, context=None):
+        await asyncio.sleep(self.latency)
+        return "Unclear. Synthetic answer."
+
+
+# FakeModel with a local batch API shaped like OpenAI's (submit the input
+# file, poll the status, download the output), for running batch mode and
+# the submit/poll layer of batch.py without a network
+class FakeBatchModel(FakeModel):
+    def __init__(self, latency=0.0, context_tokens=eligibility.CONTEXT_TOKENS):
+        super().__init__(latency, context_tokens)
+        self.outputs = {}  # batch id -> output file content
+
+    def batch_request(self, custom_id, prompt, context=None):
+        return {"custom_id": custom_id, "body": {"prompt": prompt, "context": context}}
+
+    def submit_batch(self, path):
+        with open(path, encoding="utf-8") as f:
+            requests = [json.loads(line) for line in f if line.strip()]
+        batch_id = f"batch-{len(self.outputs) + 1}"
+        self.outputs[batch_id] = "\n".join(json.dumps({
+            "custom_id": request["custom_id"],
+            "response": {"status_code": 200, "body": {"choices": [{"message": {"content": self.generate(
+                request["body"]["prompt"], request["body"]["context"])}}]}},
+        }) for request in requests)
+        return batch_id
+
+    # Every batch is complete once submitted; its output file id is the batch id
+    def batch_status(self, batch_id):
+        return "completed", batch_id, None
+
+    def batch_file(self, file_id):
+        return self.outputs[file_id]
+
+    def batch_answer(self, result):
+        return result["response"]["body"]["choices"][0]["message"]["content"]
+
+
+# Function to summarize timings (seconds) as milliseconds percentiles
+def percentiles(samples):
+    if not samples:
+        return {"count": 0}
+    samples = sorted(samples)
+
+    def pick(fraction):
+        return round(samples[min(len(samples) - 1, int(fraction * len(samples)))] * 1000, 3)
+
+    return {"count": len(samples), "mean_ms": round(sum(samples) / len(samples) * 1000, 3),
+            "p50_ms": pick(0.50), "p95_ms": pick(0.95), "p99_ms": pick(0.99)}
+
+
+# Function to return the peak resident set size of this process and of its
+# finished children, in MB; None where it cannot be measured
+def peak_rss():
+    try:
+        import resource
+    except ImportError:
+        # Windows has no resource module; psutil, when installed, gives this
+        # process's peak working set there
+        try:
+            import psutil
+        except ImportError:
+            return None
+        peak = getattr(psutil.Process().memory_info(), "peak_wset", None)
+        return None if peak is None else {"self_mb": round(peak / 2 ** 20, 1), "children_mb": None}
+
+    scale = 1 if sys.platform == "darwin" else 1024  # ru_maxrss is bytes on macOS, KB elsewhere
+    return {"self_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 2 ** 20, 1),
+            "children_mb": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale / 2 ** 20, 1)}
+
+
+# Function to call `func` once per argument tuple and return its timings
+def _time_calls(func, calls, before=None):
+    timings = []
+    for args in calls:
+        if before is not None:
+            before()
+        started = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+# Function to time every stage on its own over the corpus: URL parsing,
+# eligibility filtering, prompt building, DOCX rendering and saving
+def bench_stages(corpus, provider=None):
+    provider = provider or FakeModel()
+    links = [f"https://clinicaltrials.gov/study/{nct_id}" for nct_id in corpus]
+    results = {"extract_nct_id_from_url": percentiles(_time_calls(extract_nct_id_from_url,
+                                                                  [(link,) for link in links * 20]))}
+
+    # The context memo is cleared so every call does the full extraction
+    results["filter"] = percentiles(_time_calls(extract_eligibility_context, [(study,) for study in corpus.values()],
+                                                before=eligibility._context_cache.clear))
+    contexts = [extract_eligibility_context(study) for study in corpus.values()]
+    results["prompt"] = percentiles(_time_calls(
+        lambda context: (build_question("KRAS"), prompt_context(provider, context)), [(c,) for c in contexts]))
+
+    template = get_template()
+    entries = [{"Title": study["protocolSection"]["identificationModule"]["briefTitle"], "Link": link,
+                "AllInfo": context} for study, link, context in zip(corpus.values(), links, contexts)]
+    documents = []
+    results["docx_render"] = percentiles(_time_calls(
+        lambda number, entry: documents.append(template.render("KRAS", number, entry, SAMPLE_QUESTION,
+                                                               SAMPLE_ANSWER)),
+        list(enumerate(entries, 1))))
+
+    folder = tempfile.mkdtemp(prefix="bench_save_")
+    try:
+        def save(number, data):
+            with open(os.path.join(folder, f"doc{number}.docx"), "wb") as f:
+                f.write(data)
+        results["save"] = percentiles(_time_calls(save, list(enumerate(documents, 1))))
+    finally:
+        shutil.rmtree(folder)
+    return results
+
+
+# Function to run the streaming pipeline end to end over the corpus against
+# the local stub and the fake model, with fresh caches and `rate` requests per
+# second to the stub. With `batch` the answers go through batch mode and
+# FakeBatchModel's local batch API instead. Returns throughput and the
+# per-stage latencies the run's own metrics observed.
+def bench_pipeline(corpus, http_latency=0.0, model_latency=0.0, fetch_workers=8, concurrency=8,
+                   render_workers=2, rate=clinicaltrials.RATE_LIMIT, batch=False):
+    folder = tempfile.mkdtemp(prefix="bench_run_")
+    caches = (clinicaltrials.study_cache.cache_dir, answers.answer_cache.cache_dir)
+    clinicaltrials.study_cache.cache_dir = os.path.join(folder, "studies")
+    answers.answer_cache.cache_dir = os.path.join(folder, "answers")
+    eligibility._context_cache.clear()
+    rate_limit, pipeline.RATE_LIMIT = pipeline.RATE_LIMIT, rate
+
+    metrics.reset()
+    provider = FakeBatchModel(model_latency) if batch else FakeModel(model_latency)
+    links = [f"https://clinicaltrials.gov/study/{nct_id}" for nct_id in corpus]
+    try:
+        with StubServer(corpus, http_latency) as stub:
+            target = pipeline.Target(provider, os.path.join(folder, "out"), concurrency)
+            started = time.perf_counter()
+            saved = pipeline.run_targets([target], links, "bench", "KRAS", "KRAS", fetch_workers=fetch_workers,
+                                         url=stub.url, render_workers=render_workers, batch=batch)
+            elapsed = time.perf_counter() - started
+    finally:
+        clinicaltrials.study_cache.cache_dir, answers.answer_cache.cache_dir = caches
+        pipeline.RATE_LIMIT = rate_limit
+        shutil.rmtree(folder)
+
+    results = {stage: percentiles(samples) for stage, samples in metrics.samples.items()}
+    results["throughput"] = {"documents": len(saved), "seconds": round(elapsed, 3),
+                             "docs_per_s": round(len(saved) / elapsed, 1)}
+    return results
+
+
+# Function to time `writer` over `count` documents; returns per-document
+# milliseconds and the peak traced allocation of one document in KB
+def _time_writer(writer, folder, count):
+    timings = []
+    for number in range(1, count + 1):
+        started = time.perf_counter()
+        writer(folder, "bench", "KRAS", number, SAMPLE_ENTRY, SAMPLE_QUESTION, SAMPLE_ANSWER)
+        timings.append((time.perf_counter() - started) * 1000)
+
+    tracemalloc.start()
+    writer(folder, "bench", "KRAS", 0, SAMPLE_ENTRY, SAMPLE_QUESTION, SAMPLE_ANSWER)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    timings.sort()
+    return {
+        "documents": count,
+        "mean_ms": round(sum(timings) / count, 3),
+        "p50_ms": round(timings[count // 2], 3),
+        "docs_per_s": round(count / (sum(timings) / 1000), 1),
+        "peak_alloc_kb": round(peak / 1024, 1),
+    }
+
+
+# Function to compare the python-docx writer with the template writer
+def bench_documents(count=200):
+    folder = tempfile.mkdtemp(prefix="bench_docs_")
+    try:
+        started = time.perf_counter()
+        get_template()
+        template_ms = (time.perf_counter() - started) * 1000
+
+        results = {
+            "python-docx": _time_writer(write_trial_document_docx, folder, count),
+            "template": _time_writer(write_trial_document, folder, count),
+        }
+        results["template"]["setup_ms"] = round(template_ms, 3)
+        results["speedup"] = round(results["python-docx"]["mean_ms"] / results["template"]["mean_ms"], 1)
+        return results
+    finally:
+        shutil.rmtree(folder)
+
+
+# Function to print one benchmark's results as a small table
+def print_results(name, results):
+    print(name)
+    for row_name, row in results.items():
+        if isinstance(row, dict):
+            print(f"  {row_name:<24} " + "  ".join(f"{key}={value}" for key, value in row.items()))
+        else:
+            print(f"  {row_name:<24} {row}")
+
+
+# Function to print how the p50 and throughput figures moved against an
+# earlier results file
+def print_comparison(results, baseline):
+    print(f"Compared with {baseline['path']}")
+    for name, rows in results.items():
+        for row_name, row in rows.items() if isinstance(rows, dict) else ():
+            before = baseline.get(name, {}).get(row_name)
+            if not isinstance(row, dict) or not isinstance(before, dict):
+                continue
+            for key in ("p50_ms", "docs_per_s", "mean_ms"):
+                if before.get(key) and key in row:
+                    print(f"  {name}.{row_name}.{key}: {before[key]} -> {row[key]} ({row[key] / before[key]:.2f}x)")
+                    break
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="benchmark", description="Benchmarks for the trial pipeline over a synthetic "
+                                                                   "corpus, a local API stub and a fake model.")
+    parser.add_argument("--studies", type=int, default=60, help="synthetic studies in the corpus (default: 60)")
+    parser.add_argument("--sizes", default=",".join(str(size) for size in CRITERIA_SIZES),
+                        help="comma-separated eligibilityCriteria sizes in bytes (default: 1000,10000,100000)")
+    parser.add_argument("--http-latency", type=float, default=0.02, help="stub API latency in seconds")
+    parser.add_argument("--model-latency", type=float, default=0.2, help="fake model latency in seconds")
+    parser.add_argument("--rate", type=float, default=clinicaltrials.RATE_LIMIT,
+                        help="requests per second to the stub, 0 for no limit (default: the pipeline's limit)")
+    parser.add_argument("--workers", type=int, default=8, help="fetch and model workers (default: 8)")
+    parser.add_argument("--documents", type=int, default=200, help="documents per writer (default: 200)")
+    parser.add_argument("--only", help="comma-separated benchmarks to run (stages, pipeline, batch, documents)")
+    parser.add_argument("--json", help="save the results to this JSON file")
+    parser.add_argument("--compare", help="JSON file of an earlier run to compare with")
+    args = parser.parse_args(argv)
+
+    only = args.only.split(",") if args.only else ["stages", "pipeline", "batch", "documents"]
+    corpus = synthetic_corpus(args.studies, [int(size) for size in args.sizes.split(",")])
+    results = {}
+    if "stages" in only:
+        results["stages"] = bench_stages(corpus)
+    if "pipeline" in only:
+        results["pipeline"] = bench_pipeline(corpus, args.http_latency, args.model_latency, args.workers,
+                                             args.workers, rate=args.rate)
+    if "batch" in only:
+        results["batch"] = bench_pipeline(corpus, args.http_latency, 0.0, args.workers, args.workers, rate=args.rate,
+                                          batch=True)
+    if "documents" in only:
+        results["documents"] = bench_documents(args.documents)
+    results["environment"] = {"python": platform.python_version(), "platform": platform.platform(),
+                              "cpus": os.cpu_count(), "studies": args.studies, "sizes": args.sizes,
+                              "peak_rss": peak_rss()}
+
+    for name, result in results.items():
+        print_results(name, result)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        print_comparison(results, {**baseline, "path": args.compare})
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,303 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from metrics import metrics
+from replay import ArchiveSession
+from study_cache import StudyCache
+
+base_url = "https://clinicaltrials.gov/api/v2/studies"
+
+# Defaults for the concurrent fetch stage
+FETCH_WORKERS = 8
+RATE_LIMIT = 10  # requests per second per host
+REQUEST_TIMEOUT = 30  # seconds
+
+# Defaults for bulk retrieval through the /studies list endpoint. Only the
+# fields the pipeline reads are requested: the title, the eligibility module
+# and the last update date the cache revalidates against.
+BULK_BATCH_SIZE = 100
+STUDY_FIELDS = [
+    "protocolSection.identificationModule.nctId",
+    "protocolSection.identificationModule.briefTitle",
+    "protocolSection.eligibilityModule",
+    "protocolSection.statusModule.lastUpdatePostDateStruct",
+]
+# Projection of the listing query that tells which cached studies changed
+CHANGE_FIELDS = [
+    "protocolSection.identificationModule.nctId",
+    "protocolSection.statusModule.lastUpdatePostDateStruct",
+]
+
+# Cache shared by every script in this folder, so a study is downloaded once
+# no matter how many gene lists (or scripts) reference it
+study_cache = StudyCache()
+
+# replay.Archive that new sessions record into or replay from; None for live HTTP
+http_archive = None
+
+
+# Spaces out requests to the same host so at most `rate` start per second
+class RateLimiter:
+    def __init__(self, rate=RATE_LIMIT):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next_slot = {}
+        self._lock = threading.Lock()
+
+    def wait(self, url):
+        if not self.interval:
+            return
+        host = urlparse(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+# Function to extract nctId from URL
+def extract_nct_id_from_url(url):
+    path = urlparse(url).path
+    nct_id = path.split('/')[-1]
+    return nct_id
+
+
+# Function to index gene link lists by trial: {nctId: [genes listing it]}
+def genes_by_trial(links_by_gene):
+    trial_genes = {}
+    for gene, links in links_by_gene.items():
+        for link in links:
+            genes = trial_genes.setdefault(extract_nct_id_from_url(link), [])
+            if gene not in genes:
+                genes.append(gene)
+    return trial_genes
+
+
+# Function to return the date a study was last updated on ClinicalTrials.gov, or None
+def last_update(study):
+    status = study.get('protocolSection', {}).get('statusModule', {})
+    return status.get('lastUpdatePostDateStruct', {}).get('date')
+
+
+# Function to build the validators a downloaded study is cached with
+def _validators(study, response=None):
+    headers = getattr(response, "headers", None) or {}
+    validators = {"etag": headers.get("ETag"), "lastModified": headers.get("Last-Modified"),
+                  "updated": last_update(study)}
+    return {name: value for name, value in validators.items() if value}
+
+
+# Function to build the conditional GET headers of a cached entry
+def _conditional_headers(entry):
+    validators = entry.get("validators", {}) if entry else {}
+    headers = {}
+    if validators.get("etag"):
+        headers["If-None-Match"] = validators["etag"]
+    if validators.get("lastModified"):
+        headers["If-Modified-Since"] = validators["lastModified"]
+    return headers
+
+
+# Function to create a keep-alive session whose connection pool fits `workers`
+# threads, going through http_archive when one is set
+def create_session(workers=FETCH_WORKERS):
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=workers)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    if http_archive is not None:
+        return ArchiveSession(session, http_archive)
+    return session
+
+
+# Function to fetch a single study, using the on-disk cache when possible. An
+# expired entry stored with an ETag or Last-Modified is revalidated with a
+# conditional GET and kept when the server answers 304 Not Modified.
+def fetch_study(nctId, cache=study_cache, session=None, rate_limiter=None, url=base_url):
+    stale = None
+    if cache is not None:
+        study = cache.get(nctId)
+        if study is not None:
+            metrics.count("study_cache_hits")
+            return study
+        metrics.count("study_cache_misses")
+        stale = cache.entry(nctId)
+
+    study_url = f"{url}/{nctId}"
+    if rate_limiter is not None:
+        rate_limiter.wait(study_url)
+    try:
+        with metrics.timer("fetch", nctId=nctId):
+            response = (session or requests).get(study_url, headers=_conditional_headers(stale),
+                                                 timeout=REQUEST_TIMEOUT)
+    except requests.RequestException as e:
+        metrics.count("fetch_failures")
+        print(f"Failed to fetch data for {nctId}:", e)
+        return None
+
+    metrics.count("bytes_downloaded", len(response.content))
+    if response.status_code == 304 and stale is not None:
+        metrics.count("studies_not_modified")
+        cache.restamp(nctId)
+        return stale["study"]
+    if response.status_code != 200:
+        metrics.count("fetch_failures")
+        print(f"Failed to fetch data for {nctId}. Status code:", response.status_code)
+        return None
+
+    study = response.json()  # Parse JSON response
+    if cache is not None:
+        cache.put(nctId, study, validators=_validators(study, response))
+    return study
+
+
+# Function to fetch many studies concurrently over one pooled session.
+# Returns a list aligned with nct_ids, holding None for studies that failed.
+# Expired cached studies, or all of them with `revalidate`, are checked for
+# updates first (see revalidate_studies), unless the caller already did
+# (`revalidated`).
+def fetch_studies(nct_ids, workers=FETCH_WORKERS, rate=RATE_LIMIT, cache=study_cache, url=base_url, bulk=False,
+                  revalidate=False, revalidated=False):
+    if cache is not None and not revalidated:
+        revalidate_studies(nct_ids, cache, url, rate, revalidate, STUDY_FIELDS if bulk else None)
+    if bulk:
+        return fetch_studies_bulk(nct_ids, rate=rate, cache=cache, url=url)
+
+    unique_ids = list(dict.fromkeys(nct_ids))
+    rate_limiter = RateLimiter(rate)
+
+    with create_session(workers) as session, ThreadPoolExecutor(max_workers=workers) as executor:
+        studies = executor.map(
+            lambda nctId: fetch_study(nctId, cache, session, rate_limiter, url),
+            unique_ids,
+        )
+        by_id = dict(zip(unique_ids, studies))
+
+    return [by_id[nctId] for nctId in nct_ids]
+
+
+# Function to run one paged list query for a batch of NCT IDs, following nextPageToken
+def _query_studies(session, rate_limiter, url, nct_ids, fields):
+    params = {
+        "filter.ids": ",".join(nct_ids),
+        "pageSize": len(nct_ids),
+        "format": "json",
+    }
+    if fields:
+        params["fields"] = ",".join(fields)
+
+    studies = []
+    while True:
+        rate_limiter.wait(url)
+        with metrics.timer("fetch", studies=len(nct_ids)):
+            response = session.get(url, params=params, timeout=REQUEST_TIMEOUT)
+        metrics.count("bytes_downloaded", len(response.content))
+        if response.status_code != 200:
+            metrics.count("fetch_failures")
+            print(f"Failed to fetch studies {nct_ids[0]}..{nct_ids[-1]}. Status code:", response.status_code)
+            return studies
+
+        page = response.json()
+        studies.extend(page.get("studies", []))
+        next_page_token = page.get("nextPageToken")
+        if not next_page_token:
+            return studies
+        params["pageToken"] = next_page_token
+
+
+# Function to fetch many studies through a handful of /studies list queries
+# instead of one GET per NCT ID. Returns a list aligned with nct_ids.
+def fetch_studies_bulk(nct_ids, batch_size=BULK_BATCH_SIZE, fields=STUDY_FIELDS, rate=RATE_LIMIT,
+                       cache=study_cache, url=base_url):
+    by_id = {}
+    missing = []
+    for nctId in dict.fromkeys(nct_ids):
+        study = cache.get(nctId, fields) if cache is not None else None
+        if study is not None:
+            by_id[nctId] = study
+        else:
+            missing.append(nctId)
+    metrics.count("study_cache_hits", len(by_id))
+    metrics.count("study_cache_misses", len(missing))
+
+    rate_limiter = RateLimiter(rate)
+    with create_session(1) as session:
+        for start in range(0, len(missing), batch_size):
+            batch = missing[start:start + batch_size]
+            try:
+                studies = _query_studies(session, rate_limiter, url, batch, fields)
+            except requests.RequestException as e:
+                print(f"Failed to fetch studies {batch[0]}..{batch[-1]}:", e)
+                continue
+
+            for study in studies:
+                nctId = study['protocolSection']['identificationModule']['nctId']
+                by_id[nctId] = study
+                if cache is not None:
+                    cache.put(nctId, study, fields, _validators(study))
+
+    for nctId in missing:
+        if nctId not in by_id:
+            print(f"Failed to fetch data for {nctId}. Not returned by the bulk query")
+
+    return [by_id.get(nctId) for nctId in nct_ids]
+
+
+# Function to check cached studies for updates with one cheap listing query
+# (CHANGE_FIELDS only) per BULK_BATCH_SIZE studies: an expired study (every
+# cached one with `force`) whose last update date is unchanged is marked fresh
+# again; a changed one is dropped so it is downloaded, filtered and answered
+# anew. Studies the listing cannot settle are left expired for fetch_study to
+# revalidate with a conditional GET or download. Returns the changed nctIds.
+def revalidate_studies(nct_ids, cache=study_cache, url=base_url, rate=RATE_LIMIT, force=False, fields=None):
+    stored = {}  # nctId -> last update date the cached study was stored with
+    unsettled = []
+    for nctId in dict.fromkeys(nct_ids):
+        entry = cache.entry(nctId, fields)
+        if entry is None or (cache.is_fresh(entry) and not force):
+            continue
+        updated = entry.get("validators", {}).get("updated")
+        if updated:
+            stored[nctId] = updated
+        else:
+            unsettled.append(nctId)
+    if not stored:
+        for nctId in unsettled if force else []:
+            cache.restamp(nctId, 0)
+        return []
+
+    listed = {}
+    rate_limiter = RateLimiter(rate)
+    batches = list(stored)
+    with create_session(1) as session:
+        for start in range(0, len(batches), BULK_BATCH_SIZE):
+            batch = batches[start:start + BULK_BATCH_SIZE]
+            try:
+                studies = _query_studies(session, rate_limiter, url, batch, CHANGE_FIELDS)
+            except requests.RequestException as e:
+                print(f"Failed to check studies {batch[0]}..{batch[-1]} for updates:", e)
+                continue
+            for study in studies:
+                listed[study['protocolSection']['identificationModule']['nctId']] = last_update(study)
+
+    unchanged = [nctId for nctId, updated in stored.items() if listed.get(nctId) == updated]
+    changed = [nctId for nctId, updated in stored.items() if listed.get(nctId) not in (None, updated)]
+    for nctId in unchanged:
+        cache.restamp(nctId)
+    for nctId in changed:
+        cache.delete(nctId)
+    checked = len(stored) + len(unsettled)
+    unsettled += [nctId for nctId in stored if listed.get(nctId) is None]
+    if force:
+        for nctId in unsettled:
+            cache.restamp(nctId, 0)
+    metrics.count("studies_unchanged", len(unchanged))
+    metrics.count("studies_changed", len(changed))
+    print(f"Revalidated {checked} cached studies: {len(unchanged)} unchanged, "
+          f"{len(changed)} changed, {len(unsettled)} left to a conditional GET or download")
+    return changed
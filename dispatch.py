@@ -0,0 +1,81 @@
+import asyncio
+import collections
+import time
+
+from metrics import metrics
+from retry import default_policy, retry_after
+
+# Defaults for concurrent model calls
+MAX_IN_FLIGHT = 4
+
+# One event loop reused by every run_async, so async SDK clients that pool
+# connections per loop stay usable from one gene list to the next
+_loop = None
+
+
+# Function to roughly estimate the prompt tokens of a job (~4 characters per token)
+def estimate_tokens(*job):
+    return sum(len(str(part)) for part in job) // 4
+
+
+# Requests-per-minute and tokens-per-minute budget over a sliding 60 second window
+class RateBudget:
+    def __init__(self, rpm=None, tpm=None, window=60.0):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.window = window
+        self._sent = collections.deque()  # (time, tokens) of recent requests
+        self._resume_at = 0.0
+
+    # Wait until a request of `tokens` fits in the budget, then record it
+    async def acquire(self, tokens):
+        while True:
+            now = time.monotonic()
+            if now < self._resume_at:
+                await asyncio.sleep(self._resume_at - now)
+                continue
+
+            while self._sent and now - self._sent[0][0] >= self.window:
+                self._sent.popleft()
+            used = sum(sent_tokens for _, sent_tokens in self._sent)
+            fits_rpm = self.rpm is None or len(self._sent) < self.rpm
+            fits_tpm = self.tpm is None or not self._sent or used + tokens <= self.tpm
+            if fits_rpm and fits_tpm:
+                self._sent.append((now, tokens))
+                return
+            await asyncio.sleep(self._sent[0][0] + self.window - now)
+
+    # Hold back every request for `seconds`, used after the provider answers 429
+    def pause(self, seconds):
+        self._resume_at = max(self._resume_at, time.monotonic() + seconds)
+
+
+# Function to run `await call(*job)`, a request of `tokens` prompt tokens, once
+# the budget allows, retrying failures per `policy`. Raises RetryError once the
+# policy gives up on the job.
+async def run_job(call, job, budget, tokens, policy=default_policy):
+    started = time.monotonic()
+    attempt = 0
+    while True:
+        attempt += 1
+        with metrics.timer("rate_wait"):
+            await budget.acquire(tokens)
+        try:
+            with metrics.timer("model"):
+                return await call(*job)
+        except Exception as e:
+            metrics.count("model_errors")
+            delay = policy.next_delay(e, attempt, started)
+            metrics.count("retries")
+            if retry_after(e) is not None:
+                budget.pause(delay)
+            else:
+                await asyncio.sleep(delay)
+
+
+# Function to run a coroutine to completion on the shared event loop
+def run_async(coroutine):
+    global _loop
+    if _loop is None or _loop.is_closed():
+        _loop = asyncio.new_event_loop()
+    return _loop.run_until_complete(coroutine)
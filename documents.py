@@ -0,0 +1,298 @@
+import os
+import re
+import struct
+import time
+import zipfile
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+from docx import Document
+from docx.shared import RGBColor
+
+import profiling
+from metrics import metrics
+
+PROGRESS_EVERY = 25  # documents between two progress lines
+
+
+# Function to build the document of one trial with python-docx; `entry` holds
+# the trial's Title, Link and AllInfo. This is the reference layout that the
+# template writer below reproduces.
+def build_trial_document(gene_short, number, entry, question, answer):
+    doc = Document()
+
+    # Add a title to the document
+    doc.add_heading(f'Clinical Trials Data {gene_short} - Document {number}', level=1)
+
+    # Add data to the document
+    doc.add_heading(f"{entry['Title']}")
+    doc.add_heading(f"Clinical Trial: {entry['Link']}", level=2)
+    doc.add_paragraph(entry['AllInfo'])
+
+    p_question = doc.add_paragraph()
+    p_question.add_run("Question:\n").font.color.rgb = RGBColor(255, 0, 0)  # Red color
+    if question is not None:
+        p_question.add_run(question).font.color.rgb = RGBColor(255, 0, 0)
+    else:
+        p_question.add_run("No question available").font.color.rgb = RGBColor(255, 0, 0)
+
+    p_answer = doc.add_paragraph()
+    p_answer.add_run("Answer:\n").font.color.rgb = RGBColor(255, 0, 0)  # Red color
+    if answer is not None:
+        p_answer.add_run(answer).font.color.rgb = RGBColor(255, 0, 0)
+    else:
+        p_answer.add_run("No answer available").font.color.rgb = RGBColor(255, 0, 0)
+        print(f'Clinical Trials Data {gene_short} - Document {number} could not get an answer')
+
+    doc.add_paragraph("")  # Empty paragraph for spacing
+    return doc
+
+
+# Function to write `data` to `path` under a temporary name first, so an
+# interrupted run never leaves a truncated .docx behind
+def _save_atomic(path, data=None, doc=None):
+    tmp_path = f"{path}.tmp"
+    if doc is not None:
+        doc.save(tmp_path)
+    else:
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+    os.replace(tmp_path, path)
+
+
+# Function to build and save one trial with python-docx (the slow reference path)
+def write_trial_document_docx(folder_path, file_prefix, gene_short, number, entry, question, answer):
+    doc_file_path = os.path.join(folder_path, f"{file_prefix}_data_{gene_short}{number}.docx")
+    doc = build_trial_document(gene_short, number, entry, question, answer)
+    _save_atomic(doc_file_path, doc=doc)
+    return doc_file_path
+
+
+# Placeholders marking the variable text in the template document
+def _slot(name):
+    return f"\ue000{name}\ue001"
+
+
+_SLOT_RUN = re.compile(r'<w:t(?: xml:space="preserve")?>([^<]*\ue000[^<]*)</w:t>')
+_SLOT_PART = re.compile(r'\ue000(\w+)\ue001')
+_RUN_CHUNK = re.compile(r'[\t\n\r]|[^\t\n\r]+')
+# Characters lxml refuses to serialize; text containing them takes the python-docx path
+_XML_INVALID = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\ud800-\udfff\ufffe\uffff]')
+
+
+# Function to turn run text into the run content python-docx would emit:
+# tabs become <w:tab/>, line breaks <w:br/> and everything else <w:t> elements
+def run_content(text):
+    parts = []
+    for chunk in _RUN_CHUNK.findall(text):
+        if chunk == "\t":
+            parts.append("<w:tab/>")
+        elif chunk in ("\n", "\r"):
+            parts.append("<w:br/>")
+        else:
+            escaped = chunk.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+            space = ' xml:space="preserve"' if len(chunk.strip()) < len(chunk) else ""
+            parts.append(f"<w:t{space}>{escaped}</w:t>")
+    return "".join(parts)
+
+
+# Function to return the current time as zip (DOS) time and date fields
+def _dos_timestamp():
+    t = time.localtime()
+    return (t.tm_hour << 11 | t.tm_min << 5 | t.tm_sec // 2,
+            (t.tm_year - 1980) << 9 | t.tm_mon << 5 | t.tm_mday)
+
+
+# Function to write a .docx package into the seekable file `out`: the reused
+# template parts as they are and word/document.xml deflated from the text
+# chunks in `document_chunks`, so a large document never has to be held whole
+def write_package(out, parts, document_chunks):
+    dos_time, dos_date = _dos_timestamp()
+    central = []
+    for part in parts:
+        offset = out.tell()
+        if part is None:
+            name = "word/document.xml"
+            out.write(b"\0" * (30 + len(name)))  # local header, filled in below
+            compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+            crc = size = compress_size = 0
+            for chunk in document_chunks:
+                raw = chunk.encode("utf-8")
+                crc = zlib.crc32(raw, crc)
+                size += len(raw)
+                deflated = compressor.compress(raw)
+                compress_size += len(deflated)
+                out.write(deflated)
+            deflated = compressor.flush()
+            compress_size += len(deflated)
+            out.write(deflated)
+            end = out.tell()
+            out.seek(offset)
+        else:
+            name, crc, compress_size, size, body = part
+            end = None
+        name = name.encode("ascii")
+        out.write(struct.pack("<IHHHHHIIIHH", 0x04034b50, 20, 0, zipfile.ZIP_DEFLATED,
+                              dos_time, dos_date, crc, compress_size, size, len(name), 0))
+        out.write(name)
+        if end is None:
+            out.write(body)
+        else:
+            out.seek(end)
+        central.append(struct.pack("<IHHHHHHIIIHHHHHII", 0x02014b50, 0x0314, 20, 0, zipfile.ZIP_DEFLATED,
+                                   dos_time, dos_date, crc, compress_size, size, len(name),
+                                   0, 0, 0, 0, 0o600 << 16, offset) + name)
+    directory_offset = out.tell()
+    directory = b"".join(central)
+    out.write(directory)
+    out.write(struct.pack("<IHHHHIIH", 0x06054b50, 0, 0, len(central), len(central),
+                          len(directory), directory_offset, 0))
+
+
+# Prepared copy of the trial document package. python-docx builds it once with
+# placeholder text; every part except word/document.xml is then kept as the
+# deflated bytes already in the zip, so rendering a trial only substitutes the
+# placeholder runs, deflates document.xml and writes the zip records around
+# the reused parts (styles and the rest are ~800 KB that are never re-deflated).
+class DocumentTemplate:
+    def __init__(self):
+        entry = {"Title": _slot("TITLE"), "Link": _slot("LINK"), "AllInfo": _slot("CONTEXT")}
+        doc = build_trial_document(_slot("GENE"), _slot("NUMBER"), entry, _slot("QUESTION"), _slot("ANSWER"))
+        buffer = BytesIO()
+        doc.save(buffer)
+        data = buffer.getvalue()
+
+        # (name, crc, compressed size, size, deflated bytes); None stands for document.xml
+        self.parts = []
+        with zipfile.ZipFile(BytesIO(data)) as package:
+            for info in package.infolist():
+                if info.filename == "word/document.xml":
+                    self.parts.append(None)
+                    document_xml = package.read(info).decode("utf-8")
+                    continue
+                name_length, extra_length = struct.unpack("<HH", data[info.header_offset + 26:info.header_offset + 30])
+                begin = info.header_offset + 30 + name_length + extra_length
+                self.parts.append((info.filename, info.CRC, info.compress_size, info.file_size,
+                                   data[begin:begin + info.compress_size]))
+
+        # document.xml up to the body content, and from the section properties on
+        body_start = document_xml.index("<w:body>") + len("<w:body>")
+        body_end = document_xml.rindex("<w:sectPr")
+        self.head, self.tail = document_xml[:body_start], document_xml[body_end:]
+
+        # The body split into literal XML and placeholder runs; each run is a
+        # list of literal text and slot names making up its full text
+        body = document_xml[body_start:body_end]
+        self.pieces = []
+        position = 0
+        for match in _SLOT_RUN.finditer(body):
+            self.pieces.append(body[position:match.start()])
+            self.pieces.append(_SLOT_PART.split(match.group(1)))
+            position = match.end()
+        self.pieces.append(body[position:])
+
+    # Function to return the slot values of one trial
+    @staticmethod
+    def values(gene_short, number, entry, question, answer):
+        return {
+            "GENE": f"{gene_short}",
+            "NUMBER": f"{number}",
+            "TITLE": f"{entry['Title']}",
+            "LINK": f"{entry['Link']}",
+            "CONTEXT": entry['AllInfo'],
+            "QUESTION": question if question is not None else "No question available",
+            "ANSWER": answer if answer is not None else "No answer available",
+        }
+
+    # Function to build the body XML of one trial; returns None when the text
+    # cannot be written as XML, so the caller can use python-docx instead
+    def body_xml(self, values):
+        xml = []
+        for piece in self.pieces:
+            if isinstance(piece, str):
+                xml.append(piece)
+                continue
+            # Odd positions of the split are slot names
+            text = "".join(values[part] if i % 2 else part for i, part in enumerate(piece))
+            if _XML_INVALID.search(text):
+                return None
+            xml.append(run_content(text))
+        # python-docx adds no run at all for an empty heading or paragraph
+        return "".join(xml).replace("<w:r></w:r>", "").replace("<w:p></w:p>", "<w:p/>")
+
+    # Function to return the .docx bytes for one trial, or None (see body_xml)
+    def render(self, gene_short, number, entry, question, answer):
+        body = self.body_xml(self.values(gene_short, number, entry, question, answer))
+        if body is None:
+            return None
+        out = BytesIO()
+        write_package(out, self.parts, [self.head + body + self.tail])
+        return out.getvalue()
+
+
+_template = None
+
+
+# Function to return this process's document template, building it on first use
+def get_template():
+    global _template
+    if _template is None:
+        _template = DocumentTemplate()
+    return _template
+
+
+# Function to build and save the document of one trial like
+# write_trial_document; returns (path, render seconds, save seconds) so
+# callers in another process can report the timings to their metrics
+def write_trial_document_timed(folder_path, file_prefix, gene_short, number, entry, question, answer):
+    doc_file_path = os.path.join(folder_path, f"{file_prefix}_data_{gene_short}{number}.docx")
+    started = time.perf_counter()
+    data = get_template().render(gene_short, number, entry, question, answer)
+    if data is None:
+        doc = build_trial_document(gene_short, number, entry, question, answer)
+        rendered = time.perf_counter()
+        _save_atomic(doc_file_path, doc=doc)
+        return doc_file_path, rendered - started, time.perf_counter() - rendered
+    if answer is None:
+        print(f'Clinical Trials Data {gene_short} - Document {number} could not get an answer')
+
+    rendered = time.perf_counter()
+    _save_atomic(doc_file_path, data)
+    return doc_file_path, rendered - started, time.perf_counter() - rendered
+
+
+# Function to build and save the document of one trial; `entry` holds the
+# trial's Title, Link and AllInfo. The file is cloned from the prepared
+# template and holds the same parts python-docx would write. Returns the
+# path of the saved file.
+def write_trial_document(folder_path, file_prefix, gene_short, number, entry, question, answer):
+    return write_trial_document_timed(folder_path, file_prefix, gene_short, number, entry, question, answer)[0]
+
+
+def _write_record(record):
+    return write_trial_document_timed(*record)
+
+
+# Function to print a progress line every PROGRESS_EVERY documents and at the end
+def report_progress(done, total, label):
+    if done == total or done % PROGRESS_EVERY == 0:
+        print(f"Saved {done}/{total} {label} documents")
+
+
+# Function to build and save many documents in parallel worker processes.
+# Each record holds the arguments of write_trial_document, so every file is
+# built exactly as the serial path would build it. Returns the saved paths in
+# record order.
+def render_documents(records, workers=None, label=""):
+    records = list(records)
+    workers = workers or os.cpu_count() or 1
+    paths = []
+    with ProcessPoolExecutor(workers, **profiling.worker_options()) as executor:
+        chunksize = max(1, len(records) // (4 * workers))
+        for path, render_seconds, save_seconds in executor.map(_write_record, records, chunksize=chunksize):
+            metrics.observe("render", render_seconds)
+            metrics.observe("save", save_seconds, output=path)
+            paths.append(path)
+            report_progress(len(paths), len(records), label)
+    return paths
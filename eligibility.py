@@ -0,0 +1,157 @@
+import re
+
+# Fields of protocolSection.eligibilityModule sent to the model, in prompt
+# order; the criteria come last so trimming only ever touches the tail
+ELIGIBILITY_FIELDS = ["sex", "minimumAge", "stdAges", "healthyVolunteers", "studyPopulation", "eligibilityCriteria"]
+
+# Line labels of the compact context
+FIELD_LABELS = {
+    "sex": "Sex",
+    "minimumAge": "Minimum age",
+    "stdAges": "Age groups",
+    "healthyVolunteers": "Healthy volunteers",
+    "studyPopulation": "Study population",
+    "eligibilityCriteria": "Eligibility criteria",
+}
+CRITERIA_HEADER = "Eligibility criteria:"
+
+# Default prompt budget of the eligibility context, in tokens
+CONTEXT_TOKENS = 3000
+
+_MARKDOWN_ESCAPE = re.compile(r"\\([\\`*_{}\[\]()#+\-.!<>=~|^])")
+_SPACES = re.compile(r"[ \t\u00a0]+")
+_BULLET = re.compile(r"^([*\-\u2022+])\s+")
+SECTION_HEADING = re.compile(r"^[^-\d\s].{0,80}:$")
+
+# Extracted contexts by nctId, together with the module they were built from
+_context_cache = {}
+
+
+# Function to turn criteria text into compact lines: markdown escapes such as
+# "\>=" undone, whitespace collapsed, blank lines dropped and every bullet
+# written as "- " (indented once for sub-items)
+def compact_criteria(text):
+    lines = []
+    for line in _MARKDOWN_ESCAPE.sub(r"\1", text).splitlines():
+        indent = len(line) - len(line.lstrip())
+        line = _SPACES.sub(" ", line).strip()
+        if not line:
+            continue
+        if _BULLET.match(line):
+            line = ("  - " if indent >= 2 else "- ") + _BULLET.sub("", line)
+        lines.append(line)
+    return lines
+
+
+# Function to build the eligibility context of a study straight from its
+# eligibilityModule as compact plain text: one "Label: value" line per short
+# field, then the criteria lines under CRITERIA_HEADER
+def extract_eligibility_context(study):
+    protocol = study.get('protocolSection', {})
+    module = protocol.get('eligibilityModule', {})
+    nctId = protocol.get('identificationModule', {}).get('nctId')
+
+    cached = _context_cache.get(nctId)
+    if cached is not None and cached[0] == module:
+        return cached[1]
+
+    lines = []
+    for field in ELIGIBILITY_FIELDS:
+        value = module.get(field)
+        if value is None or value == "" or value == []:
+            continue
+        if field == "eligibilityCriteria":
+            lines.append(CRITERIA_HEADER)
+            lines += compact_criteria(value)
+            continue
+        if isinstance(value, bool):
+            value = "Yes" if value else "No"
+        elif isinstance(value, list):
+            value = ", ".join(str(item) for item in value)
+        else:
+            value = " ".join(compact_criteria(str(value)))
+        lines.append(f"{FIELD_LABELS[field]}: {value}")
+    context = "\n".join(lines)
+
+    if nctId is not None:
+        _context_cache[nctId] = (module, context)
+    return context
+
+
+# Function to tell whether a criteria line heads its inclusion or exclusion
+# criteria
+def is_section_heading(line):
+    return bool(SECTION_HEADING.match(line)) and ("inclu" in line.lower() or "exclu" in line.lower())
+
+
+# Function to cut `line` by words to at most `budget` tokens, marked with a
+# trailing "..."; "" when not even one word fits
+def cut_line(line, budget, count_tokens):
+    words = line.split(" ")
+    low, high = 0, len(words)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if count_tokens(" ".join(words[:middle]) + " ...") <= budget:
+            low = middle
+        else:
+            high = middle - 1
+    return " ".join(words[:low]) + " ..." if low and words[:low] != ["-"] else ""
+
+
+# Function to trim a context built by extract_eligibility_context to `budget`
+# tokens as measured by `count_tokens`. The short fields and the inclusion and
+# exclusion headings of the criteria are kept (other lines ending in ":", such
+# as "Adequate organ function:", are ordinary items); criteria items are
+# taken from all sections in turn, so each section keeps its first items, the
+# first item that does not fit is cut by words, and dropped items are noted
+# per section. Only a budget below the kept lines themselves is exceeded.
+def fit_context(context, budget, count_tokens):
+    if not budget or count_tokens(context) <= budget:
+        return context
+    lines = context.split("\n")
+    if CRITERIA_HEADER not in lines:
+        return context
+    start = lines.index(CRITERIA_HEADER) + 1
+    head = lines[:start]
+
+    # [heading or None, item lines] per section of the criteria
+    sections = [[None, []]]
+    for line in lines[start:]:
+        if is_section_heading(line):
+            sections.append([line, []])
+        else:
+            sections[-1][1].append(line)
+    sections = [section for section in sections if section[0] is not None or section[1]]
+
+    used = sum(count_tokens(line) + 1 for line in head)
+    used += sum(count_tokens(heading) + 1 for heading, _ in sections if heading)
+    used += sum(count_tokens(f"- ({len(items)} more criteria omitted)") + 1 for _, items in sections if items)
+    kept = [0] * len(sections)
+    growing = [i for i, (_, items) in enumerate(sections) if items]
+    while growing:
+        for i in list(growing):
+            items = sections[i][1]
+            cost = count_tokens(items[kept[i]]) + 1
+            if used + cost > budget:
+                # The first item that does not fit is cut to the rest of the
+                # budget, so criteria written as one long paragraph still get in
+                cut = cut_line(items[kept[i]], budget - used - 1, count_tokens)
+                if cut:
+                    items[kept[i]] = cut
+                    used += count_tokens(cut) + 1
+                    kept[i] += 1
+                growing.remove(i)
+                continue
+            used += cost
+            kept[i] += 1
+            if kept[i] == len(items):
+                growing.remove(i)
+
+    trimmed = list(head)
+    for (heading, items), count in zip(sections, kept):
+        if heading:
+            trimmed.append(heading)
+        trimmed += items[:count]
+        if count < len(items):
+            trimmed.append(f"- ({len(items) - count} more criteria omitted)")
+    return "\n".join(trimmed)
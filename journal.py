@@ -0,0 +1,45 @@
+import json
+import os
+import time
+
+# Journal file kept inside each output folder
+JOURNAL_NAME = "journal.jsonl"
+
+
+# Append-only JSONL record of per-trial progress, keyed by (provider, gene, nctId).
+# The last line for a key wins, so a retried trial simply appends a new line.
+class RunJournal:
+    def __init__(self, path):
+        self.path = path
+        self._records = {}
+        try:
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # a line cut short by a crash
+                    self._records[(record["provider"], record["gene"], record["nctId"])] = record
+        except OSError:
+            pass
+
+    # Function to tell whether a trial's document was written with an answer,
+    # from the study as last updated on `updated` when that date is known
+    def is_done(self, provider, gene, nct_id, updated=None):
+        record = self._records.get((provider, gene, nct_id))
+        if updated and record is not None and record.get("updated") not in (None, updated):
+            return False
+        return (record is not None and record["status"] == "written"
+                and os.path.exists(record.get("output") or ""))
+
+    def get(self, provider, gene, nct_id):
+        return self._records.get((provider, gene, nct_id))
+
+    # Function to append the new status of a trial: "fetch_failed",
+    # "answer_failed" (document written without an answer) or "written"
+    def record(self, provider, gene, nct_id, status, **fields):
+        record = {"provider": provider, "gene": gene, "nctId": nct_id, "status": status, "time": time.time(), **fields}
+        self._records[(provider, gene, nct_id)] = record
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
@@ -0,0 +1,140 @@
+import json
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Stages timed by the pipeline, in the order the summary lists them
+STAGES = ["fetch", "filter", "prompt", "rate_wait", "model", "render", "save"]
+
+
+# Function to pick the `fraction` percentile of sorted samples
+def _percentile(samples, fraction):
+    return samples[min(len(samples) - 1, int(fraction * len(samples)))] if samples else 0.0
+
+
+# Lightweight run metrics: stage timers, counters (retries, bytes, tokens,
+# cache hits, ...) and an optional JSON-lines log of every observation.
+# Thread-safe, so fetch threads and the event loop can share one instance.
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._log = None
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.samples = {}  # stage -> seconds per observation
+            self.counters = {}
+            self.started = time.time()
+
+    # Function to append every observation to a JSON-lines file at `path`
+    def open_log(self, path):
+        self.close_log()
+        self._log = open(path, "a", encoding="utf-8")
+
+    def close_log(self):
+        with self._lock:
+            if self._log is not None:
+                self._log.close()
+                self._log = None
+
+    def _write(self, record):
+        if self._log is not None:
+            self._log.write(json.dumps({"time": round(time.time(), 3), **record}) + "\n")
+
+    def observe(self, stage, seconds, **fields):
+        with self._lock:
+            self.samples.setdefault(stage, []).append(seconds)
+            self._write({"stage": stage, "seconds": round(seconds, 6), **fields})
+
+    def count(self, name, value=1, **fields):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+            if fields:
+                self._write({"counter": name, "value": value, **fields})
+
+    # Function to time the block as one observation of `stage`
+    @contextmanager
+    def timer(self, stage, **fields):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started, **fields)
+
+    # Function to return {stage: {count, total_s, mean_ms, p50_ms, p95_ms, max_ms}}
+    def stage_summary(self):
+        with self._lock:
+            samples = {stage: sorted(values) for stage, values in self.samples.items()}
+        order = STAGES + sorted(set(samples) - set(STAGES))
+        return {stage: {
+            "count": len(samples[stage]),
+            "total_s": round(sum(samples[stage]), 3),
+            "mean_ms": round(sum(samples[stage]) / len(samples[stage]) * 1000, 3),
+            "p50_ms": round(_percentile(samples[stage], 0.50) * 1000, 3),
+            "p95_ms": round(_percentile(samples[stage], 0.95) * 1000, 3),
+            "max_ms": round(samples[stage][-1] * 1000, 3),
+        } for stage in order if samples.get(stage)}
+
+    # Function to print the end-of-run table. Stages overlap, so busy time is
+    # compared across stages to tell a network-, model- or disk-bound run.
+    def print_summary(self):
+        stages = self.stage_summary()
+        wall = time.time() - self.started
+        print(f"Run metrics ({wall:.1f} s wall time)")
+        print(f"  {'stage':<10} {'count':>7} {'busy s':>9} {'mean ms':>10} {'p50 ms':>10} {'p95 ms':>10} "
+              f"{'max ms':>10}")
+        for stage, row in stages.items():
+            print(f"  {stage:<10} {row['count']:>7} {row['total_s']:>9.1f} {row['mean_ms']:>10.1f} "
+                  f"{row['p50_ms']:>10.1f} {row['p95_ms']:>10.1f} {row['max_ms']:>10.1f}")
+        for name, value in sorted(self.counters.items()):
+            print(f"  {name}: {value:,}")
+        if stages:
+            busiest = max(stages, key=lambda stage: stages[stage]["total_s"])
+            print(f"  most busy time: {busiest}")
+
+    # Function to render the metrics in the Prometheus text format
+    def prometheus(self):
+        lines = ["# TYPE trials_stage_seconds summary"]
+        for stage, row in self.stage_summary().items():
+            lines.append(f'trials_stage_seconds{{stage="{stage}",quantile="0.5"}} {row["p50_ms"] / 1000}')
+            lines.append(f'trials_stage_seconds{{stage="{stage}",quantile="0.95"}} {row["p95_ms"] / 1000}')
+            lines.append(f'trials_stage_seconds_sum{{stage="{stage}"}} {row["total_s"]}')
+            lines.append(f'trials_stage_seconds_count{{stage="{stage}"}} {row["count"]}')
+        with self._lock:
+            counters = sorted(self.counters.items())
+        for name, value in counters:
+            lines.append(f"# TYPE trials_{name}_total counter")
+            lines.append(f"trials_{name}_total {value}")
+        return "\n".join(lines) + "\n"
+
+    # Function to serve prometheus() at http://127.0.0.1:port/metrics from a
+    # background thread; returns the server so it can be shut down
+    def serve(self, port):
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != "/metrics":
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                body = metrics.prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+
+# Metrics of this process, shared by every module of the pipeline
+metrics = Metrics()
@@ -0,0 +1,234 @@
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import profiling
+from answers import answer_cache, answer_trial, batch_questions_and_answers
+from clinicaltrials import (FETCH_WORKERS, RATE_LIMIT, RateLimiter, base_url, create_session,
+                            extract_nct_id_from_url, fetch_studies, fetch_study, last_update, study_cache)
+from dispatch import MAX_IN_FLIGHT, RateBudget, run_async
+from documents import render_documents, report_progress, write_trial_document_timed
+from eligibility import extract_eligibility_context
+from journal import JOURNAL_NAME, RunJournal
+from metrics import metrics
+from prescreen import classify
+
+BUFFER_SIZE = 16  # trials waiting between two stages
+RENDER_WORKERS = os.cpu_count() or 1  # processes building documents
+
+
+# One provider's side of a run: the folder it writes to, its journal and how
+# fast it may call the model. Several targets can share one fetch pass. With
+# `prescreen`, trials the local pre-screen can decide skip the model.
+class Target:
+    def __init__(self, provider, folder_path, concurrency=MAX_IN_FLIGHT, rpm=None, tpm=None, prescreen=False):
+        self.provider = provider
+        self.folder_path = folder_path
+        self.concurrency = concurrency
+        self.prescreen = prescreen
+        self.budget = RateBudget(rpm, tpm)
+        self.journal = RunJournal(os.path.join(folder_path, JOURNAL_NAME))
+        self.reports = None  # RunReports collecting consolidated outputs, if wanted
+
+
+# Function to build the data entry of a fetched study
+def make_entry(link, study):
+    with metrics.timer("filter"):
+        return {
+            "Link": link,
+            "NctId": extract_nct_id_from_url(link),
+            "AllInfo": extract_eligibility_context(study),
+            "Title": study['protocolSection']['identificationModule'].get('briefTitle', 'Unknown'),
+            "Updated": last_update(study),
+        }
+
+
+# Function to journal a trial whose document was saved at `path` and add it
+# to the target's consolidated reports
+def record_saved(target, gene, gene_short, number, entry, question, answer, path):
+    prescreen = classify(gene, entry['AllInfo'])[0]
+    target.journal.record(target.provider.name, gene, entry['NctId'],
+                          "written" if answer is not None else "answer_failed", answer=answer, output=path,
+                          title=entry['Title'], link=entry['Link'], updated=entry['Updated'], prescreen=prescreen)
+    metrics.count("documents_written" if answer is not None else "documents_without_answer")
+    if target.reports is not None:
+        target.reports.add(target.provider.name, gene, gene_short, number, entry, question, answer, path,
+                           prescreen)
+
+
+# Streams every trial through fetch -> extract -> answer -> write. The stages
+# run concurrently and are joined by bounded queues, so the first document is
+# written after one trial's latency and memory stays flat for any list size.
+# Each trial is fetched once and then fanned out to every target still
+# missing it; each target answers with its own workers, and documents are
+# built in the shared render_pool processes. Trials found in `entries` (a
+# run plan's prepared entries) skip the fetch.
+async def _stream(targets, numbered_links, file_prefix, gene, gene_short, trial_genes, fetch_workers,
+                  buffer_size, url, render_pool, render_workers, entries):
+    to_fetch = asyncio.Queue(buffer_size)
+    to_answer = {target: asyncio.Queue(buffer_size) for target in targets}
+    to_write = {target: asyncio.Queue(buffer_size) for target in targets}
+    rate_limiter = RateLimiter(RATE_LIMIT)
+    loop = asyncio.get_running_loop()
+    total = sum(len(waiting) for _, _, waiting in numbered_links)
+    saved = []
+
+    async def fetcher(session):
+        while True:
+            number, link, waiting = await to_fetch.get()
+            try:
+                nctId = extract_nct_id_from_url(link)
+                entry = entries.get(nctId) if entries else None
+                if entry is None:
+                    study = await asyncio.to_thread(fetch_study, nctId, study_cache, session, rate_limiter, url)
+                    entry = make_entry(link, study) if study is not None else None
+                if entry is not None:
+                    for target in waiting:
+                        await to_answer[target].put((number, entry))
+                else:
+                    for target in waiting:
+                        target.journal.record(target.provider.name, gene, nctId, "fetch_failed")
+            except Exception as e:
+                print(f"Failed to process {link}: {e}")
+            finally:
+                to_fetch.task_done()
+
+    async def answerer(target):
+        while True:
+            number, entry = await to_answer[target].get()
+            try:
+                genes = trial_genes.get(entry['NctId'], [gene]) if trial_genes else None
+                question, answer = await answer_trial(target.provider, gene, entry['AllInfo'], genes,
+                                                      budget=target.budget, prescreen=target.prescreen)
+                await to_write[target].put((number, entry, question, answer))
+            except Exception as e:
+                print(f"Failed to answer {entry['Link']}: {e}")
+            finally:
+                to_answer[target].task_done()
+
+    async def writer(target):
+        while True:
+            number, entry, question, answer = await to_write[target].get()
+            try:
+                path, render_seconds, save_seconds = await loop.run_in_executor(
+                    render_pool, write_trial_document_timed, target.folder_path, file_prefix, gene_short, number,
+                    entry, question, answer)
+                metrics.observe("render", render_seconds)
+                metrics.observe("save", save_seconds, output=path)
+                record_saved(target, gene, gene_short, number, entry, question, answer, path)
+                saved.append(path)
+                report_progress(len(saved), total, gene_short)
+            except Exception as e:
+                print(f"Failed to save document {number} for {gene_short}: {e}")
+            finally:
+                to_write[target].task_done()
+
+    with create_session(fetch_workers) as session:
+        workers = [asyncio.create_task(fetcher(session)) for _ in range(fetch_workers)]
+        for target in targets:
+            workers += [asyncio.create_task(answerer(target)) for _ in range(target.concurrency)]
+            workers += [asyncio.create_task(writer(target)) for _ in range(render_workers)]
+
+        for number, link, waiting in numbered_links:
+            await to_fetch.put((number, link, waiting))
+        await to_fetch.join()
+        for target in targets:
+            await to_answer[target].join()
+            await to_write[target].join()
+
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+    return saved
+
+
+# Materialized variant for batch mode: everything is fetched first, then each
+# target sends all of its questions as one batch job and writes the documents
+def _run_batched(targets, numbered_links, file_prefix, gene, gene_short, trial_genes, url, render_workers,
+                 entries):
+    entries = dict(entries or {})
+    missing = [link for _, link, _ in numbered_links if extract_nct_id_from_url(link) not in entries]
+    for link, study in zip(missing, fetch_studies([extract_nct_id_from_url(link) for link in missing],
+                                                  url=url, bulk=True)):
+        if study is not None:
+            entries[extract_nct_id_from_url(link)] = make_entry(link, study)
+    saved = []
+    for target in targets:
+        numbered = []
+        for number, link, waiting in numbered_links:
+            if target not in waiting:
+                continue
+            entry = entries.get(extract_nct_id_from_url(link))
+            if entry is not None:
+                numbered.append((number, entry))
+            else:
+                target.journal.record(target.provider.name, gene, extract_nct_id_from_url(link), "fetch_failed")
+
+        questions_and_answers = batch_questions_and_answers(
+            target.provider, gene, [entry['AllInfo'] for _, entry in numbered],
+            [trial_genes.get(entry['NctId'], [gene]) for _, entry in numbered] if trial_genes else None,
+            prescreen=target.prescreen)
+
+        paths = render_documents([(target.folder_path, file_prefix, gene_short, number, entry, question, answer)
+                                  for (number, entry), (question, answer) in zip(numbered, questions_and_answers)],
+                                 render_workers, gene_short)
+        for (number, entry), (question, answer), path in zip(numbered, questions_and_answers, paths):
+            record_saved(target, gene, gene_short, number, entry, question, answer, path)
+        saved += paths
+    return saved
+
+
+# Function to fetch the trials of one gene list once, answer them with every
+# target's provider and write one document per trial and target into the
+# target's folder. Documents are numbered by the trial's position in `links`.
+# Progress is journaled in each folder; with `resume`, trials whose document
+# was already written with an answer are skipped, so a rerun only retries
+# what failed or never ran. `entries` ({nctId: entry}, e.g. from a run plan)
+# supplies trials that were already fetched and extracted. Returns the paths
+# of the documents saved.
+def run_targets(targets, links, file_prefix, gene, gene_short, trial_genes=None, fetch_workers=FETCH_WORKERS,
+                buffer_size=BUFFER_SIZE, batch=False, resume=True, url=base_url, render_workers=RENDER_WORKERS,
+                entries=None):
+    for target in targets:
+        os.makedirs(target.folder_path, exist_ok=True)
+
+    numbered_links = []
+    for number, link in enumerate(links, 1):
+        nctId = extract_nct_id_from_url(link)
+        updated = entries[nctId]['Updated'] if entries and nctId in entries else None
+        waiting = []
+        for target in targets:
+            if not (resume and target.journal.is_done(target.provider.name, gene, nctId, updated)):
+                waiting.append(target)
+            elif target.reports is not None:
+                target.reports.add_resumed(gene, gene_short, number,
+                                           target.journal.get(target.provider.name, gene, nctId))
+        if waiting:
+            numbered_links.append((number, link, waiting))
+    if len(numbered_links) < len(links):
+        print(f"Skipping {len(links) - len(numbered_links)} {gene_short} trial(s) completed in an earlier run")
+
+    if batch:
+        saved = _run_batched(targets, numbered_links, file_prefix, gene, gene_short, trial_genes, url,
+                             render_workers, entries)
+    else:
+        with ProcessPoolExecutor(render_workers, **profiling.worker_options()) as render_pool:
+            saved = run_async(_stream(targets, numbered_links, file_prefix, gene, gene_short, trial_genes,
+                                      fetch_workers, buffer_size, url, render_pool, render_workers, entries))
+
+    for target in targets:
+        if target.reports is not None:
+            target.reports.finish_gene(gene_short)
+    print("All documents saved successfully.")
+    print(f"Answer cache: {answer_cache.hits} hits, {answer_cache.misses} misses")
+    return saved
+
+
+# Function to run one gene list with a single provider writing into folder_path
+def run_pipeline(provider, links, folder_path, file_prefix, gene, gene_short, trial_genes=None,
+                 fetch_workers=FETCH_WORKERS, concurrency=MAX_IN_FLIGHT, rpm=None, tpm=None,
+                 buffer_size=BUFFER_SIZE, batch=False, resume=True, url=base_url, render_workers=RENDER_WORKERS,
+                 prescreen=False):
+    return run_targets([Target(provider, folder_path, concurrency, rpm, tpm, prescreen)], links, file_prefix, gene,
+                       gene_short, trial_genes, fetch_workers, buffer_size, batch, resume, url, render_workers)
@@ -0,0 +1,111 @@
+from answers import (MULTI_GENE_TEMPLATE, QUESTION_TEMPLATE, answer_cache, build_question, cache_template,
+                     prompt_context, prompt_tokens)
+from clinicaltrials import (FETCH_WORKERS, STUDY_FIELDS, base_url, extract_nct_id_from_url, fetch_studies,
+                            genes_by_trial, revalidate_studies, study_cache)
+from pipeline import make_entry
+from prescreen import classify, rule_answer
+
+
+# Work plan of a whole run, computed before any model call: every study the
+# gene lists name is fetched and extracted once, and each target's model
+# calls are counted against the answer cache.
+class RunPlan:
+    def __init__(self, gene_lists, trial_genes, entries, cached_studies, failed):
+        self.gene_lists = gene_lists
+        self.trial_genes = trial_genes  # nctId -> genes listing it
+        self.entries = entries  # nctId -> entry, shared by every gene and target
+        self.cached_studies = cached_studies
+        self.failed = failed
+        self.targets = {}  # provider name -> work counts
+        self.labels = {}  # pre-screen label -> trials
+
+    @property
+    def trials(self):
+        return sum(len(links) for links in self.gene_lists.values())
+
+
+# Function to build the plan of a run. `gene_lists` maps each gene to its
+# study links; with `multi_gene` a trial's genes share one model call. Studies
+# are downloaded through bulk /studies list queries unless `bulk` is False.
+def plan_run(targets, gene_lists, multi_gene=False, resume=True, fetch_workers=FETCH_WORKERS, bulk=True,
+             url=base_url, cache=answer_cache, revalidate=False):
+    trial_genes = genes_by_trial(gene_lists)
+    links = {}
+    for gene_links in gene_lists.values():
+        for link in gene_links:
+            links.setdefault(extract_nct_id_from_url(link), link)
+
+    # Cached studies are checked for updates, and those still cached are
+    # counted, before fetch_studies reads them
+    nct_ids = list(links)
+    fields = STUDY_FIELDS if bulk else None
+    revalidate_studies(nct_ids, url=url, force=revalidate, fields=fields)
+    cached_studies = sum(1 for nctId in nct_ids if study_cache.get(nctId, fields) is not None)
+    studies = fetch_studies(nct_ids, fetch_workers, url=url, bulk=bulk, revalidated=True)
+    entries = {}
+    failed = []
+    for nctId, study in zip(nct_ids, studies):
+        if study is None:
+            failed.append(nctId)
+        else:
+            entries[nctId] = make_entry(links[nctId], study)
+    plan = RunPlan(gene_lists, trial_genes, entries, cached_studies, failed)
+    for gene, gene_links in gene_lists.items():
+        for link in gene_links:
+            entry = entries.get(extract_nct_id_from_url(link))
+            if entry is not None:
+                label = classify(gene, entry['AllInfo'])[0]
+                plan.labels[label] = plan.labels.get(label, 0) + 1
+
+    for target in targets:
+        provider = target.provider
+        template = cache_template(provider, MULTI_GENE_TEMPLATE if multi_gene else QUESTION_TEMPLATE)
+        pending = 0
+        cached = 0
+        decided = 0  # answered by the pre-screen
+        asked = {}  # nctId -> genes needing an answer
+        contexts = {nctId: prompt_context(provider, entry['AllInfo']) for nctId, entry in entries.items()}
+        for gene, gene_links in gene_lists.items():
+            for link in gene_links:
+                nctId = extract_nct_id_from_url(link)
+                entry = entries.get(nctId)
+                if resume and target.journal.is_done(provider.name, gene, nctId, entry and entry['Updated']):
+                    continue
+                pending += 1
+                if entry is None:
+                    continue
+                if target.prescreen and rule_answer(gene, entry['AllInfo']) is not None:
+                    decided += 1
+                elif cache.contains(provider.name, provider.model, template, gene, contexts[nctId]):
+                    cached += 1
+                else:
+                    asked.setdefault(nctId, set()).add(gene)
+
+        # One call per missing answer, or per trial when its genes are asked together
+        calls = 0
+        tokens = 0
+        for nctId, genes in asked.items():
+            if multi_gene:
+                questions = [build_question(sorted(trial_genes[nctId]))]
+            else:
+                questions = [build_question(gene) for gene in sorted(genes)]
+            calls += len(questions)
+            tokens += sum(prompt_tokens(provider, question, contexts[nctId]) for question in questions)
+        plan.targets[provider.name] = {"pending": pending, "cached": cached, "decided": decided,
+                                       "calls": calls, "tokens": tokens}
+    return plan
+
+
+# Function to print the plan before the run spends anything
+def print_plan(plan):
+    unique = len(plan.trial_genes)
+    print(f"Plan: {plan.trials} trials in {len(plan.gene_lists)} gene list(s), {unique} unique studies "
+          f"({plan.trials - unique} shared between lists)")
+    print(f"Studies: {plan.cached_studies} cached ({plan.cached_studies / max(unique, 1):.0%}), "
+          f"{unique - plan.cached_studies - len(plan.failed)} downloaded, {len(plan.failed)} failed")
+    print("Pre-screen: " + ", ".join(f"{count} {label}" for label, count in sorted(plan.labels.items())))
+    for name, work in plan.targets.items():
+        decided = f", {work['decided']} decided by the pre-screen" if work['decided'] else ""
+        print(f"{name}: {work['pending']} trials to answer, {work['cached']} cached answers "
+              f"({work['cached'] / max(work['pending'], 1):.0%}){decided}, ~{work['calls']} model calls, "
+              f"~{work['tokens']:,} prompt tokens")
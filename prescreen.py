@@ -0,0 +1,169 @@
+import re
+
+from eligibility import CRITERIA_HEADER, SECTION_HEADING
+
+NOT_MENTIONED = "gene not mentioned"
+REQUIRED = "explicitly required"
+EXCLUDED = "explicitly excluded"
+AMBIGUOUS = "ambiguous"
+
+# Other names of each gene, matched as whole words. Short symbols are matched
+# case-sensitively (so "kit" in "test kit" is not KIT), full names ignoring case.
+GENE_ALIASES = {
+    "ALK": ["ALK", "EML4-ALK", "anaplastic lymphoma kinase"],
+    "BRAF": ["BRAF", "B-RAF", "B-Raf", "V600E", "V600K", "V600"],
+    "EGFR": ["EGFR", "HER1", "ERBB1", "ErbB1", "ErbB-1", "L858R", "T790M", "epidermal growth factor receptor"],
+    "ERBB2": ["ERBB2", "ErbB2", "ErbB-2", "HER2", "HER-2", "HER2/neu", "human epidermal growth factor receptor 2"],
+    "KIT": ["KIT", "c-KIT", "c-Kit", "CD117"],
+    "KRAS": ["KRAS", "K-RAS", "K-ras", "Ki-ras", "G12C", "G12D", "G12V"],
+}
+
+# Words right before or after a mention that turn it into its absence
+# ("no known KRAS mutation", "EGFR wild-type", "HER2-negative")
+_NEGATION_BEFORE = re.compile(r"\b(?:no|not|without|absence of|absent|lack of|lacking|negative for|wild[- ]?type)"
+                              r"\b[^.;,]{0,20}$", re.I)
+_NEGATION_AFTER = re.compile(r"^[^.;,]{0,15}?\b(?:wild[- ]?type|wt|negative|non[- ]?mutated|absent)\b", re.I)
+
+# Wording right after a mention that makes it about the patient's mutation
+# ("KRAS G12C mutation", "HER2-positive", "ALK rearrangement"); a mention that
+# is itself a variant (V600E, EML4-ALK) needs none
+_MUTATION_AFTER = re.compile(r"^[^.;,]{0,25}?(?:\b(?i:mutations?|mutated|mutant|positive|rearrange\w*|fusions?|"
+                             r"amplifi\w*|alterations?)\b|\b[A-Z]\d{2,4}[A-Z]\b)")
+_VARIANT = re.compile(r"^(?:[A-Z]\d{2,4}[A-Z]?|EML4-ALK)$")
+
+# Wording around a mention that makes it about a drug, not the patient's
+# mutation ("ALK inhibitor", "anti-HER2 therapy", "EGFR TKI")
+_THERAPY_BEFORE = re.compile(r"(?:\banti-?|\b(?:inhibitors? of|targeting|directed against)\s+)$", re.I)
+_THERAPY_AFTER = re.compile(r"^[^.;,]{0,25}?\b(?:inhibitors?|tkis?|therap\w*|treatments?|treated|targeted|"
+                            r"antibod\w*|agents?|drugs?)\b", re.I)
+
+# Wording after a mention that leaves its result open ("EGFR mutation status",
+# "positive or negative")
+_OPEN_AFTER = re.compile(r"^[^.;]{0,40}?\b(?:status|test(?:ed|ing)?|unknown|either)\b", re.I)
+_EITHER_AFTER = re.compile(r"^[^.;,]{0,25}?(?:\bor\b|/)", re.I)
+
+_patterns = {}
+
+
+# Function to return the compiled matcher for a gene and its aliases
+def gene_pattern(gene):
+    if gene not in _patterns:
+        aliases = sorted(set(GENE_ALIASES.get(gene.upper(), []) + [gene]), key=len, reverse=True)
+        symbols = "|".join(re.escape(alias) for alias in aliases if " " not in alias)
+        names = "|".join(re.escape(alias) for alias in aliases if " " in alias)
+        alternatives = [symbols] + ([f"(?i:{names})"] if names else [])
+        _patterns[gene] = re.compile(rf"(?<!\w)(?:{'|'.join(alternatives)})(?!\w)")
+    return _patterns[gene]
+
+
+# Function to tell how a line mentions the gene: "mutated" (the patient's
+# mutation is present), "negated" (it is absent) or "ambiguous" (a therapy
+# target, a test result left open, a bare mention, or "wild-type or mutant")
+def mention_kind(line, matches):
+    kinds = set()
+    for match in matches:
+        before, after = line[:match.start()], line[match.end():]
+        negated = _NEGATION_BEFORE.search(before) or _NEGATION_AFTER.search(after)
+        mutated = _VARIANT.match(match.group()) or _MUTATION_AFTER.search(after)
+        if _THERAPY_BEFORE.search(before) or _THERAPY_AFTER.search(after) or _OPEN_AFTER.search(after):
+            kinds.add("ambiguous")
+        elif mutated and not _NEGATION_BEFORE.search(before) and _NEGATION_AFTER.search(after) \
+                and _EITHER_AFTER.search(after):
+            kinds.add("ambiguous")
+        elif negated:
+            kinds.add("negated")
+        elif mutated:
+            kinds.add("mutated")
+        else:
+            kinds.add("ambiguous")
+    return kinds.pop() if len(kinds) == 1 else "ambiguous"
+
+
+# Function to label a trial for `gene` from its eligibility context without
+# the model: NOT_MENTIONED, REQUIRED (only mutation mentions in inclusion
+# criteria), EXCLUDED (only mutation mentions in exclusion criteria or negated
+# ones in inclusion criteria) or AMBIGUOUS (anything else, e.g. "prior ALK
+# inhibitor" or "KRAS wild-type or mutant"). Returns (label, first line
+# mentioning the gene or None).
+def classify(gene, context):
+    pattern = gene_pattern(gene)
+    section = "general"
+    required = []
+    excluded = []
+    other = []
+    for line in context.split("\n"):
+        if line == CRITERIA_HEADER:
+            section = "criteria"
+            continue
+        if SECTION_HEADING.match(line):
+            heading = line.lower()
+            section = "exclusion" if "exclu" in heading else "inclusion" if "inclu" in heading else "criteria"
+            continue
+        matches = list(pattern.finditer(line))
+        if not matches:
+            continue
+        kind = mention_kind(line, matches)
+        if section == "inclusion" and kind != "ambiguous":
+            (excluded if kind == "negated" else required).append(line)
+        elif section == "exclusion" and kind == "mutated":
+            excluded.append(line)
+        else:
+            other.append(line)
+
+    if not (required or excluded or other):
+        return NOT_MENTIONED, None
+    if required and not excluded and not other:
+        return REQUIRED, required[0]
+    if excluded and not required and not other:
+        return EXCLUDED, excluded[0]
+    return AMBIGUOUS, (required + excluded + other)[0]
+
+
+# Function to answer a trial the pre-screen can decide, in the form of a model
+# answer led by its verdict; None when the trial needs the model
+def rule_answer(gene, context):
+    label, line = classify(gene, context)
+    if label == NOT_MENTIONED:
+        return (f"Unclear. Pre-screen: the eligibility criteria do not mention {gene}, so a {gene} mutation "
+                f"neither qualifies nor excludes the patient; the other criteria decide.")
+    if label == REQUIRED:
+        return f"Yes. Pre-screen: the inclusion criteria require {gene}: {line.lstrip(' -')}"
+    if label == EXCLUDED:
+        return f"No. Pre-screen: the criteria exclude {gene}: {line.lstrip(' -')}"
+    return None
+
+
+# Wordings the pre-screen must get right: (gene, context, expected label)
+EXAMPLES = [
+    ("ALK", "Exclusion Criteria:\n- Prior treatment with an ALK inhibitor", AMBIGUOUS),
+    ("KRAS", "Inclusion Criteria:\n- KRAS wild-type or mutant tumors eligible", AMBIGUOUS),
+    ("ERBB2", "Inclusion Criteria:\n- Prior anti-HER2 therapy allowed", AMBIGUOUS),
+    ("EGFR", "Inclusion Criteria:\n- Known EGFR mutation status (positive or negative)", AMBIGUOUS),
+    ("EGFR", "Inclusion Criteria:\n- EGFR-mutant NSCLC\n- No prior EGFR TKI", AMBIGUOUS),
+    ("ALK", "Inclusion Criteria:\n- Bare ALK mention", AMBIGUOUS),
+    ("KRAS", "Inclusion Criteria:\n- Documented KRAS G12C mutation", REQUIRED),
+    ("ERBB2", "Inclusion Criteria:\n- HER2-positive breast cancer", REQUIRED),
+    ("BRAF", "Inclusion Criteria:\n- Melanoma with a V600E mutation", REQUIRED),
+    ("ALK", "Inclusion Criteria:\n- Tumor with an ALK rearrangement or fusion", REQUIRED),
+    ("ALK", "Exclusion Criteria:\n- Known EGFR mutation or ALK rearrangement", EXCLUDED),
+    ("EGFR", "Inclusion Criteria:\n- EGFR wild-type tumors", EXCLUDED),
+    ("KRAS", "Inclusion Criteria:\n- No known KRAS mutation", EXCLUDED),
+    ("KRAS", "Inclusion Criteria:\n- Any solid tumor", NOT_MENTIONED),
+]
+
+
+# Function to check the pre-screen against EXAMPLES; returns the failures
+def check_examples():
+    failures = []
+    for gene, context, expected in EXAMPLES:
+        label = classify(gene, f"{CRITERIA_HEADER}\n{context}")[0]
+        if label != expected:
+            failures.append(f"{gene}: {context!r} is {label}, expected {expected}")
+    return failures
+
+
+# `python prescreen.py` checks the pre-screen against EXAMPLES
+if __name__ == "__main__":
+    failures = check_examples()
+    print("\n".join(failures) or f"All {len(EXAMPLES)} pre-screen examples pass")
+    raise SystemExit(1 if failures else 0)
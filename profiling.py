@@ -0,0 +1,201 @@
+import cProfile
+import fnmatch
+import glob
+import io
+import os
+import pstats
+import sys
+import threading
+import tracemalloc
+from multiprocessing.util import Finalize
+
+PROFILE_SUFFIX = "-profile"  # profile folder, next to the output folder
+PROFILE_NAME = "run.prof"  # cProfile dump of all processes, for pstats or snakeviz
+SUMMARY_NAME = "summary.txt"
+MEMORY_NAME = "memory.txt"
+TOP = 20  # functions and allocation sites listed per section
+FRAMES = 30  # traceback depth kept by tracemalloc, deep enough to reach the stage's code
+
+# Code of each pipeline stage, as file patterns. Functions and allocations are
+# attributed to a stage by where they run (cProfile) or by any frame of their
+# traceback (tracemalloc); saving a document is part of "render".
+STAGE_CODE = {
+    "fetch": ["*/clinicaltrials.py", "*/study_cache.py", "*/requests/*", "*/urllib3/*"],
+    "filter": ["*/eligibility.py"],
+    "prompt": ["*/answers.py", "*/prescreen.py", "*/answer_cache.py"],
+    "model": ["*/providers.py", "*/dispatch.py", "*/openai/*", "*/httpx/*", "*/google/*"],
+    "render": ["*/documents.py", "*/reports.py", "*/docx/*", "*/zipfile.py"],
+}
+
+# The Profiler of this process while a profiled run is going on
+active = None
+
+
+# Function to tell whether `filename` is code of `stage`
+def in_stage(filename, stage):
+    return any(fnmatch.fnmatch(filename, pattern) for pattern in STAGE_CODE[stage])
+
+
+# Function to format a byte count
+def _size(count):
+    return f"{count / 2 ** 20:.1f} MiB" if count >= 2 ** 20 else f"{count / 1024:.1f} KiB"
+
+
+# Function to profile a worker process (a ProcessPoolExecutor initializer):
+# its cProfile stats and last tracemalloc snapshot are dumped into `folder`
+# when the worker exits, for Profiler.stop to merge
+def start_worker(folder):
+    tracemalloc.start(FRAMES)
+    tracemalloc.clear_traces()
+    profile = cProfile.Profile()
+    profile.enable()
+
+    def dump():
+        profile.disable()
+        profile.dump_stats(os.path.join(folder, f"worker-{os.getpid()}.prof"))
+        tracemalloc.take_snapshot().dump(os.path.join(folder, f"worker-{os.getpid()}.tracemalloc"))
+
+    Finalize(None, dump, exitpriority=10)
+
+
+# Function to return the ProcessPoolExecutor options of a pool whose workers
+# take part in the profiled run, if any
+def worker_options():
+    return {} if active is None else {"initializer": start_worker, "initargs": (active.folder,)}
+
+
+# Function to record the memory of the run at a point worth keeping (e.g. the
+# end of a gene list); does nothing unless a run is profiled
+def checkpoint(label):
+    if active is not None:
+        active.checkpoint(label)
+
+
+# cProfile and tracemalloc over a whole run: the main thread, the threads it
+# starts and the document worker processes. stop() writes PROFILE_NAME, a
+# SUMMARY_NAME of the hottest functions overall and per stage, and a
+# MEMORY_NAME of the largest allocation sites per stage into `folder`.
+class Profiler:
+    def __init__(self, folder, top=TOP):
+        self.folder = folder
+        self.top = top
+        self.profile = cProfile.Profile()
+        self.thread_profiles = []
+        self.snapshot = None
+        self.snapshot_label = None
+        self.stage_rows = {}
+        self._lock = threading.Lock()
+
+    def start(self):
+        global active
+        os.makedirs(self.folder, exist_ok=True)
+        for path in glob.glob(os.path.join(self.folder, "worker-*")):
+            os.remove(path)
+        tracemalloc.start(FRAMES)
+        # Before Python 3.12 a profiler only sees the thread that enabled it
+        if sys.version_info < (3, 12):
+            threading.setprofile(self._profile_thread)
+        self.profile.enable()
+        active = self
+
+    # Function to give each new thread its own profiler (threading.setprofile
+    # calls it on the thread's first event)
+    def _profile_thread(self, frame, event, arg):
+        profile = cProfile.Profile()
+        with self._lock:
+            self.thread_profiles.append(profile)
+        profile.enable()
+
+    def checkpoint(self, label):
+        snapshot = tracemalloc.take_snapshot()
+        if self.snapshot is None or _traced(snapshot) >= _traced(self.snapshot):
+            self.snapshot, self.snapshot_label = snapshot, label
+
+    # Function to stop profiling and write the reports
+    def stop(self):
+        global active
+        active = None
+        self.profile.disable()
+        threading.setprofile(None)
+        self.checkpoint("end of run")
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        stats = pstats.Stats(self.profile, stream=io.StringIO())
+        with self._lock:
+            for profile in self.thread_profiles:
+                profile.create_stats()
+                if profile.stats:
+                    stats.add(profile)
+        worker_snapshots = []
+        for path in sorted(glob.glob(os.path.join(self.folder, "worker-*"))):
+            if path.endswith(".prof"):
+                stats.add(path)
+            else:
+                worker_snapshots.append(tracemalloc.Snapshot.load(path))
+            os.remove(path)
+        stats.dump_stats(os.path.join(self.folder, PROFILE_NAME))
+
+        summary = self.summary(stats)
+        with open(os.path.join(self.folder, SUMMARY_NAME), "w", encoding="utf-8") as f:
+            f.write(summary)
+        with open(os.path.join(self.folder, MEMORY_NAME), "w", encoding="utf-8") as f:
+            f.write(self.memory(peak, worker_snapshots))
+
+    # Function to list the hottest functions: overall by cumulative and by own
+    # time, then the top functions by own time in each stage's code
+    def summary(self, stats):
+        lines = []
+        for order, title in (("cumulative", "cumulative time"), ("tottime", "own time")):
+            stream = io.StringIO()
+            stats.stream = stream
+            stats.sort_stats(order).print_stats(self.top)
+            lines += [f"== Hottest functions by {title} ==", stream.getvalue().strip(), ""]
+
+        for stage in STAGE_CODE:
+            rows = sorted(((own, cumulative, calls, function) for function, (_, calls, own, cumulative, _)
+                           in stats.stats.items() if in_stage(function[0], stage)), reverse=True)[:self.top]
+            self.stage_rows[stage] = rows
+            lines.append(f"== {stage} ({sum(row[0] for row in rows):.3f} s own time in its top functions) ==")
+            lines.append(f"  {'own s':>9} {'cum s':>9} {'calls':>9}  function")
+            for own, cumulative, calls, (filename, line, name) in rows:
+                lines.append(f"  {own:>9.3f} {cumulative:>9.3f} {calls:>9}  {name} ({filename}:{line})")
+            lines.append("")
+        return "\n".join(lines)
+
+    # Function to print the few hottest functions of each stage and where the
+    # full reports are
+    def print_summary(self, count=3):
+        print(f"Hottest functions per stage (own time; full reports in {self.folder})")
+        for stage, rows in self.stage_rows.items():
+            for own, _, calls, (filename, line, name) in rows[:count]:
+                print(f"  {stage:<7} {own:>8.3f} s {calls:>8} calls  {name} ({os.path.basename(filename)}:{line})")
+
+    # Function to list the largest live allocation sites per stage, from the
+    # fullest checkpoint of the main process and the workers' last snapshots
+    def memory(self, peak, worker_snapshots):
+        lines = [f"Peak traced memory of the main process: {_size(peak)}",
+                 f"Largest checkpoint: {self.snapshot_label} ({_size(_traced(self.snapshot))} live)",
+                 f"Worker snapshots: {len(worker_snapshots)}", ""]
+        snapshots = [self.snapshot] + worker_snapshots
+        for stage in list(STAGE_CODE) + [None]:
+            sites = {}
+            for snapshot in snapshots:
+                if stage is not None:
+                    snapshot = snapshot.filter_traces([tracemalloc.Filter(True, pattern, all_frames=True)
+                                                       for pattern in STAGE_CODE[stage]])
+                for stat in snapshot.statistics("lineno"):
+                    site = sites.setdefault(stat.traceback, [0, 0])
+                    site[0] += stat.size
+                    site[1] += stat.count
+            top = sorted(sites.items(), key=lambda item: item[1][0], reverse=True)[:self.top]
+            lines.append(f"== {stage or 'all'} ({_size(sum(size for size, _ in sites.values()))} live) ==")
+            for traceback, (size, count) in top:
+                lines.append(f"  {_size(size):>11} in {count:>7,} blocks  {traceback[0]}")
+            lines.append("")
+        return "\n".join(lines)
+
+
+# Function to return the traced bytes of a snapshot
+def _traced(snapshot):
+    return sum(trace.size for trace in snapshot.traces)
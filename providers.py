@@ -0,0 +1,196 @@
+import os
+
+from dispatch import estimate_tokens
+from eligibility import CONTEXT_TOKENS
+from metrics import metrics
+
+# Defaults for the model clients
+REQUEST_TIMEOUT = 120  # seconds per model call
+
+# Providers created so far, so each process builds one client per configuration
+_providers = {}
+
+
+# Function to count the tokens a model call reported using
+def record_usage(prompt_tokens, completion_tokens):
+    metrics.count("prompt_tokens", prompt_tokens or 0)
+    metrics.count("completion_tokens", completion_tokens or 0)
+
+
+# Function to record the usage of a Gemini response
+def _gemini_usage(response):
+    usage = getattr(response, "usage_metadata", None)
+    if usage is not None:
+        record_usage(usage.prompt_token_count, usage.candidates_token_count)
+
+
+# Function to record the usage of an OpenAI chat completion
+def _openai_usage(response):
+    if response.usage is not None:
+        record_usage(response.usage.prompt_tokens, response.usage.completion_tokens)
+
+
+# Gemini through google-generativeai. The GenerativeModel handle and its
+# channel are created once, on first use, and reused for every call; runs
+# served entirely from the answer cache never import the SDK.
+class GeminiProvider:
+    name = "gemini"
+    prompt_signature = ""
+
+    def __init__(self, model="gemini-1.5-pro", api_key=None, timeout=REQUEST_TIMEOUT, context_tokens=CONTEXT_TOKENS):
+        self.model = model
+        self.api_key = api_key
+        self.timeout = timeout
+        self.context_tokens = context_tokens
+        self._model = None
+
+    def _handle(self):
+        if self._model is None:
+            import google.generativeai as genai
+
+            genai.configure(api_key=self.api_key or os.getenv("GEMINI_API_KEY"))
+            self._model = genai.GenerativeModel(self.model)
+        return self._model
+
+    # Gemini only counts tokens with a remote call, so prompts are budgeted
+    # with the character estimate
+    def count_tokens(self, text):
+        return estimate_tokens(text)
+
+    # Gemini gets the question and the trial context as a single prompt
+    def _prompt(self, prompt, context):
+        return prompt if context is None else f"{prompt} {context}"
+
+    def generate(self, prompt, context=None):
+        response = self._handle().generate_content(self._prompt(prompt, context),
+                                                  request_options={"timeout": self.timeout})
+        _gemini_usage(response)
+        return response.text
+
+    async def generate_async(self, prompt, context=None):
+        response = await self._handle().generate_content_async(self._prompt(prompt, context),
+                                                              request_options={"timeout": self.timeout})
+        _gemini_usage(response)
+        return response.text
+
+
+# OpenAI chat completions. Each client keeps its own keep-alive connection
+# pool, so creating them once lets every call reuse warm connections. Like
+# Gemini, the SDK is only imported on first use. Retries are left to
+# retry.py, so the SDK's own retries are turned off.
+class OpenAIProvider:
+    name = "openai"
+
+    def __init__(self, model="gpt-4o", system_prompt="You are a helpful assistant.", api_key=None,
+                 timeout=REQUEST_TIMEOUT, context_tokens=CONTEXT_TOKENS):
+        self.model = model
+        self.system_prompt = system_prompt
+        self.prompt_signature = system_prompt
+        self.api_key = api_key
+        self.timeout = timeout
+        self.context_tokens = context_tokens
+        self._client = None
+        self._async_client = None
+        self._encoding = None
+
+    def _get_client(self):
+        if self._client is None:
+            from openai import OpenAI
+
+            self._client = OpenAI(api_key=self.api_key, timeout=self.timeout, max_retries=0)
+        return self._client
+
+    def _get_async_client(self):
+        if self._async_client is None:
+            from openai import AsyncOpenAI
+
+            self._async_client = AsyncOpenAI(api_key=self.api_key, timeout=self.timeout, max_retries=0)
+        return self._async_client
+
+    # Function to count tokens with the model's tokenizer when tiktoken is
+    # installed, and with the character estimate otherwise
+    def count_tokens(self, text):
+        if self._encoding is None:
+            try:
+                import tiktoken
+
+                try:
+                    self._encoding = tiktoken.encoding_for_model(self.model)
+                except KeyError:
+                    self._encoding = tiktoken.get_encoding("o200k_base")
+            except ImportError:
+                self._encoding = False
+        if self._encoding is False:
+            return estimate_tokens(text)
+        return len(self._encoding.encode(text, disallowed_special=()))
+
+    # The trial context follows the question as an assistant turn
+    def _messages(self, prompt, context):
+        messages = [
+            {"role": "system", "content": self.system_prompt},
+            {"role": "user", "content": prompt},
+        ]
+        if context is not None:
+            messages.append({"role": "assistant", "content": context})
+        return messages
+
+    def generate(self, prompt, context=None):
+        response = self._get_client().chat.completions.create(model=self.model,
+                                                              messages=self._messages(prompt, context))
+        _openai_usage(response)
+        return response.choices[0].message.content
+
+    async def generate_async(self, prompt, context=None):
+        response = await self._get_async_client().chat.completions.create(model=self.model,
+                                                                          messages=self._messages(prompt, context))
+        _openai_usage(response)
+        return response.choices[0].message.content
+
+    # Function to build one line of an OpenAI Batch input file
+    def batch_request(self, custom_id, prompt, context=None):
+        return {
+            "custom_id": custom_id,
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": {"model": self.model, "messages": self._messages(prompt, context)},
+        }
+
+    # Function to upload a Batch input file and start the job; returns the batch id
+    def submit_batch(self, path):
+        with open(path, "rb") as f:
+            input_file = self._get_client().files.create(file=f, purpose="batch")
+        batch = self._get_client().batches.create(input_file_id=input_file.id, endpoint="/v1/chat/completions",
+                                                  completion_window="24h")
+        return batch.id
+
+    # Function to return (status, output_file_id, error_file_id) of a batch job
+    def batch_status(self, batch_id):
+        batch = self._get_client().batches.retrieve(batch_id)
+        return batch.status, batch.output_file_id, batch.error_file_id
+
+    def batch_file(self, file_id):
+        return self._get_client().files.content(file_id).text
+
+    # Function to return the answer of one Batch output line, or raise if it failed
+    def batch_answer(self, result):
+        response = result.get("response") or {}
+        if result.get("error") or response.get("status_code") != 200:
+            raise RuntimeError(f"batch request {result.get('custom_id')} failed: "
+                               f"{result.get('error') or response.get('body')}")
+        usage = response["body"].get("usage") or {}
+        record_usage(usage.get("prompt_tokens"), usage.get("completion_tokens"))
+        return response["body"]["choices"][0]["message"]["content"]
+
+
+PROVIDERS = {
+    "gemini": GeminiProvider,
+    "openai": OpenAIProvider,
+}
+
+
+# Function to return the process-wide provider for `name` and settings
+def get_provider(name, **settings):
+    key = (name, tuple(sorted(settings.items())))
+    if key not in _providers:
+        _providers[key] = PROVIDERS[name](**settings)
+    return _providers[key]
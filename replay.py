@@ -0,0 +1,161 @@
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import zlib
+
+import requests
+
+# Archive modes: "record" passes calls through and stores their results,
+# "replay" serves them from the archive without touching the network
+MODES = ("record", "replay")
+
+
+# Function to compute the archive key of a model call
+def model_key(provider, prompt, context):
+    digest = hashlib.sha256()
+    for part in (provider.name, provider.model, provider.prompt_signature, prompt, context or ""):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+# SQLite archive of HTTP responses and model answers, zlib-compressed. In
+# replay mode every call sleeps `latency` seconds, or as long as the recorded
+# call took with latency="recorded", so runs keep a realistic shape.
+class Archive:
+    def __init__(self, path, mode="replay", latency=0.0):
+        if mode not in MODES:
+            raise ValueError(f"Unknown archive mode: {mode} (use {', '.join(MODES)})")
+        self.path = path
+        self.mode = mode
+        self.latency = latency
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("CREATE TABLE IF NOT EXISTS http (key TEXT PRIMARY KEY, status INTEGER, "
+                         "body BLOB, elapsed REAL)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS model (key TEXT PRIMARY KEY, answer BLOB, elapsed REAL)")
+        self._db.commit()
+
+    def _get(self, table, key):
+        with self._lock:
+            row = self._db.execute(f"SELECT * FROM {table} WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+        return row
+
+    def _put(self, table, row):
+        with self._lock:
+            self._db.execute(f"INSERT OR REPLACE INTO {table} VALUES ({', '.join('?' * len(row))})", row)
+            self._db.commit()
+
+    # Function to return the synthetic latency of a replayed call
+    def delay(self, elapsed):
+        return elapsed if self.latency == "recorded" else self.latency
+
+    def get_response(self, key):
+        row = self._get("http", key)
+        return None if row is None else (row[1], zlib.decompress(row[2]), row[3])
+
+    def put_response(self, key, status, body, elapsed):
+        self._put("http", (key, status, zlib.compress(body), elapsed))
+
+    def get_answer(self, key):
+        row = self._get("model", key)
+        return None if row is None else (zlib.decompress(row[1]).decode("utf-8"), row[2])
+
+    def put_answer(self, key, answer, elapsed):
+        self._put("model", (key, zlib.compress(answer.encode("utf-8")), elapsed))
+
+    # Function to return (recorded responses, recorded answers)
+    def counts(self):
+        with self._lock:
+            return tuple(self._db.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                         for table in ("http", "model"))
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+# The parts of a requests.Response the fetch code reads
+class ArchivedResponse:
+    def __init__(self, status_code, content):
+        self.status_code = status_code
+        self.content = content
+        self.headers = {}
+
+    def json(self):
+        return json.loads(self.content)
+
+
+# A requests session that records into, or replays from, an Archive. A GET
+# missing from the archive in replay mode fails like a dropped connection.
+class ArchiveSession:
+    def __init__(self, session, archive):
+        self.session = session
+        self.archive = archive
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.session.close()
+
+    def get(self, url, params=None, **kwargs):
+        key = requests.Request("GET", url, params=params).prepare().url
+        if self.archive.mode == "replay":
+            recorded = self.archive.get_response(key)
+            if recorded is None:
+                raise requests.ConnectionError(f"{key} is not in the replay archive")
+            status, body, elapsed = recorded
+            time.sleep(self.archive.delay(elapsed))
+            return ArchivedResponse(status, body)
+
+        started = time.monotonic()
+        response = self.session.get(url, params=params, **kwargs)
+        self.archive.put_response(key, response.status_code, response.content, time.monotonic() - started)
+        return response
+
+
+# A provider whose answers are recorded into, or replayed from, an Archive.
+# Everything else (name, model, token counting, ...) is the wrapped provider's.
+class ArchiveProvider:
+    def __init__(self, provider, archive):
+        self.provider = provider
+        self.archive = archive
+
+    def __getattr__(self, name):
+        return getattr(self.provider, name)
+
+    def _replayed(self, prompt, context):
+        recorded = self.archive.get_answer(model_key(self.provider, prompt, context))
+        if recorded is None:
+            raise RuntimeError(f"No recorded {self.provider.name} answer for this prompt in {self.archive.path}")
+        return recorded
+
+    def generate(self, prompt, context=None):
+        if self.archive.mode == "replay":
+            answer, elapsed = self._replayed(prompt, context)
+            time.sleep(self.archive.delay(elapsed))
+            return answer
+        started = time.monotonic()
+        answer = self.provider.generate(prompt, context)
+        self.archive.put_answer(model_key(self.provider, prompt, context), answer, time.monotonic() - started)
+        return answer
+
+    async def generate_async(self, prompt, context=None):
+        if self.archive.mode == "replay":
+            answer, elapsed = self._replayed(prompt, context)
+            await asyncio.sleep(self.archive.delay(elapsed))
+            return answer
+        started = time.monotonic()
+        answer = await self.provider.generate_async(prompt, context)
+        self.archive.put_answer(model_key(self.provider, prompt, context), answer, time.monotonic() - started)
+        return answer
@@ -0,0 +1,164 @@
+import csv
+import json
+import os
+import re
+import tempfile
+import zipfile
+
+from documents import get_template, run_content, write_package
+
+RESULTS_FORMATS = ("csv", "jsonl")
+RESULT_COLUMNS = ["provider", "gene", "nctId", "title", "verdict", "prescreen", "answer", "link", "document"]
+
+_VERDICT = re.compile(r"^\W*(?:eligible\W*)?(yes|no|unclear)\b", re.I)
+_PAGE_BREAK = '<w:p><w:r><w:br w:type="page"/></w:r></w:p>'
+
+
+# Function to read the verdict off an answer: "yes", "no" or "unclear" when the
+# answer starts with one, as single-gene answers are asked to (QUESTION_TEMPLATE)
+# and "Eligible: yes" multi-gene answers do; "unclear" for any other answer and
+# "" when there is none
+def parse_verdict(answer):
+    if answer is None:
+        return ""
+    match = _VERDICT.match(answer)
+    return match.group(1).lower() if match else "unclear"
+
+
+# Function to return the text of one styled paragraph as body XML
+def _paragraph(text, style=None):
+    style = f'<w:pPr><w:pStyle w:val="{style}"/></w:pPr>' if style else ""
+    return f"<w:p>{style}<w:r>{run_content(text)}</w:r></w:p>"
+
+
+# Function to return the body XML of a per-trial document already on disk
+def _document_body(path):
+    with zipfile.ZipFile(path) as package:
+        document_xml = package.read("word/document.xml").decode("utf-8")
+    return document_xml[document_xml.index("<w:body>") + len("<w:body>"):document_xml.rindex("<w:sectPr")]
+
+
+# One row per trial in a CSV or JSONL file, written as each trial completes.
+# The file only replaces its previous version once the run closes it.
+class ResultsWriter:
+    def __init__(self, path):
+        self.path = path
+        self.format = os.path.splitext(path)[1].lstrip(".")
+        if self.format not in RESULTS_FORMATS:
+            raise ValueError(f"Unsupported results format: {self.format} (use {', '.join(RESULTS_FORMATS)})")
+        self._file = open(f"{path}.tmp", "w", encoding="utf-8", newline="")
+        if self.format == "csv":
+            self._csv = csv.DictWriter(self._file, RESULT_COLUMNS)
+            self._csv.writeheader()
+
+    def add(self, row):
+        if self.format == "csv":
+            self._csv.writerow(row)
+        else:
+            self._file.write(json.dumps(row) + "\n")
+
+    def close(self):
+        self._file.close()
+        os.replace(f"{self.path}.tmp", self.path)
+
+
+# All trials of one gene in a single .docx: a contents list linking to every
+# trial, then each trial's section in document order. Sections are spooled to
+# a temporary file as they arrive, so memory stays flat for long lists.
+class GeneReport:
+    def __init__(self, gene_short):
+        self.gene_short = gene_short
+        self._spool = tempfile.TemporaryFile()
+        self._sections = {}  # number -> (contents label, spool offset, length)
+
+    # Function to add the body XML of trial `number`
+    def add(self, number, label, body):
+        # Bookmark the trial's first heading so the contents can link to it
+        bookmark = f'<w:bookmarkStart w:id="{number}" w:name="trial_{number}"/><w:bookmarkEnd w:id="{number}"/>'
+        position = body.find("</w:pPr>")
+        if position < 0:
+            body = f"<w:p>{bookmark}</w:p>{body}"
+        else:
+            position += len("</w:pPr>")
+            body = body[:position] + bookmark + body[position:]
+        data = body.encode("utf-8")
+        self._spool.seek(0, os.SEEK_END)
+        self._sections[number] = (label, self._spool.tell(), len(data))
+        self._spool.write(data)
+
+    def _chunks(self, template):
+        yield template.head
+        yield _paragraph(f"Clinical Trials Data {self.gene_short}", "Title")
+        yield _paragraph("Contents", "TOCHeading")
+        for number in sorted(self._sections):
+            link = f"<w:r><w:rPr><w:color w:val=\"0563C1\"/><w:u w:val=\"single\"/></w:rPr>" \
+                   f"{run_content(self._sections[number][0])}</w:r>"
+            yield f'<w:p><w:hyperlink w:anchor="trial_{number}" w:history="1">{link}</w:hyperlink></w:p>'
+        for number in sorted(self._sections):
+            _, offset, length = self._sections[number]
+            self._spool.seek(offset)
+            yield _PAGE_BREAK + self._spool.read(length).decode("utf-8")
+        yield template.tail
+
+    # Function to write the report to `path` and release the spool
+    def save(self, path):
+        with open(f"{path}.tmp", "wb") as out:
+            write_package(out, get_template().parts, self._chunks(get_template()))
+        os.replace(f"{path}.tmp", path)
+        self._spool.close()
+        return path
+
+
+# Consolidated outputs of one target's run next to its per-trial documents:
+# `{file_prefix}_report_{gene}.docx` per gene and one
+# `{file_prefix}_results.{results_format}` file for every gene of the run
+class RunReports:
+    def __init__(self, folder_path, file_prefix, results_format="csv"):
+        self.folder_path = folder_path
+        self.file_prefix = file_prefix
+        os.makedirs(folder_path, exist_ok=True)
+        self.results = ResultsWriter(os.path.join(folder_path, f"{file_prefix}_results.{results_format}"))
+        self.genes = {}
+
+    def _gene(self, gene_short):
+        if gene_short not in self.genes:
+            self.genes[gene_short] = GeneReport(gene_short)
+        return self.genes[gene_short]
+
+    # Function to add a trial answered in this run, with its pre-screen label
+    def add(self, provider_name, gene, gene_short, number, entry, question, answer, path, prescreen):
+        self.results.add({"provider": provider_name, "gene": gene, "nctId": entry['NctId'],
+                          "title": entry['Title'], "verdict": parse_verdict(answer),
+                          "prescreen": prescreen, "answer": answer,
+                          "link": entry['Link'], "document": path})
+        template = get_template()
+        body = template.body_xml(template.values(gene_short, number, entry, question, answer))
+        if body is not None:
+            self._gene(gene_short).add(number, f"{number}. {entry['NctId']} - {entry['Title']}", body)
+
+    # Function to add a trial written in an earlier run from its journal
+    # record and the document it left behind
+    def add_resumed(self, gene, gene_short, number, record):
+        self.results.add({"provider": record["provider"], "gene": gene, "nctId": record["nctId"],
+                          "title": record.get("title", ""), "verdict": parse_verdict(record.get("answer")),
+                          "prescreen": record.get("prescreen", ""), "answer": record.get("answer"),
+                          "link": record.get("link", ""), "document": record.get("output")})
+        try:
+            body = _document_body(record["output"])
+        except (OSError, KeyError, ValueError, zipfile.BadZipFile) as e:
+            print(f"Could not add {record['output']} to the {gene_short} report: {e}")
+            return
+        self._gene(gene_short).add(number, f"{number}. {record['nctId']} - {record.get('title', '')}", body)
+
+    # Function to save the report of one gene once all of its trials are in
+    def finish_gene(self, gene_short):
+        report = self.genes.pop(gene_short, None)
+        if report is not None:
+            path = report.save(os.path.join(self.folder_path, f"{self.file_prefix}_report_{gene_short}.docx"))
+            print(f"Saved report {path}")
+
+    def close(self):
+        for gene_short in list(self.genes):
+            self.finish_gene(gene_short)
+        self.results.close()
+        print(f"Saved results {self.results.path}")
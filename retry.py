@@ -0,0 +1,91 @@
+import random
+import re
+import time
+
+# HTTP statuses worth retrying: rate limits, timeouts and server-side failures
+RETRYABLE_STATUSES = {408, 429, 500, 502, 503, 504}
+
+# Exceptions retried by class name, so the SDKs need not be imported here
+RETRYABLE_ERROR_NAMES = {
+    "TimeoutError", "ConnectTimeout", "ReadTimeout", "ConnectionError",
+    "APITimeoutError", "APIConnectionError", "InternalServerError", "RateLimitError",
+    "DeadlineExceeded", "ServiceUnavailable", "ResourceExhausted",
+}
+
+DEFAULT_RETRY_AFTER = 10.0  # seconds to wait on a 429 without a retry hint
+
+
+# Raised when a call is not retried any further; `reason` says why
+class RetryError(Exception):
+    def __init__(self, reason, attempts, last_error):
+        super().__init__(f"gave up after {attempts} attempt(s): {reason}: {last_error!r}")
+        self.reason = reason
+        self.attempts = attempts
+        self.last_error = last_error
+
+
+def _status(exc):
+    status = getattr(exc, "status_code", None) or getattr(exc, "code", None)
+    return status if isinstance(status, int) else None
+
+
+# Function to tell whether an exception is worth retrying. Authentication,
+# invalid requests, safety blocks and anything unrecognised are fatal.
+def is_retryable(exc):
+    status = _status(exc)
+    if status is not None:
+        return status in RETRYABLE_STATUSES
+    return isinstance(exc, (TimeoutError, ConnectionError)) or type(exc).__name__ in RETRYABLE_ERROR_NAMES
+
+
+# Function to return how long to wait before retrying a rate-limited call,
+# or None if the exception is not a rate-limit error. Understands the
+# retry-after headers sent by OpenAI and the RetryInfo details sent by Gemini.
+def retry_after(exc):
+    if _status(exc) != 429 and type(exc).__name__ not in ("RateLimitError", "ResourceExhausted"):
+        return None
+
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    if headers.get("retry-after-ms"):
+        return float(headers["retry-after-ms"]) / 1000
+    if headers.get("retry-after"):
+        try:
+            return float(headers["retry-after"])
+        except ValueError:
+            pass
+
+    for detail in getattr(exc, "details", None) or []:
+        delay = getattr(detail, "retry_delay", None)
+        if delay is not None:
+            return delay.seconds + delay.nanos / 1e9
+
+    match = re.search(r"retry in ([\d.]+)s", str(exc))
+    if match:
+        return float(match.group(1))
+    return DEFAULT_RETRY_AFTER
+
+
+# Jittered exponential backoff bounded by an attempt count and a total deadline
+class RetryPolicy:
+    def __init__(self, max_attempts=8, base_delay=1.0, max_delay=60.0, deadline=600.0):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+
+    # Function to return the delay before the next attempt, or raise RetryError
+    # if `exc` should not be retried. `attempt` counts the attempts made so far.
+    def next_delay(self, exc, attempt, started):
+        if not is_retryable(exc):
+            raise RetryError("fatal error", attempt, exc) from exc
+        if attempt >= self.max_attempts:
+            raise RetryError("too many attempts", attempt, exc) from exc
+
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+        delay = max(delay, retry_after(exc) or 0)
+        if time.monotonic() + delay - started > self.deadline:
+            raise RetryError("deadline exceeded", attempt, exc) from exc
+        return delay
+
+
+default_policy = RetryPolicy()
@@ -0,0 +1,123 @@
+import json
+import os
+import time
+
+# Default location and limits of the on-disk study cache shared by gemini.py and gpt.py
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".study_cache")
+CACHE_TTL = 7 * 24 * 60 * 60  # seconds a cached study stays fresh
+CACHE_MAX_ENTRIES = 5000
+
+
+# On-disk cache of ClinicalTrials.gov study records, one JSON file per nctId.
+# Entries older than ttl are treated as missing by get() but kept, with the
+# validators they were stored with (ETag, Last-Modified, last update date), so
+# they can be revalidated instead of downloaded again. Once more than
+# max_entries are stored, the least recently used ones are evicted.
+class StudyCache:
+    def __init__(self, cache_dir=CACHE_DIR, ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+    def _path(self, nct_id):
+        return os.path.join(self.cache_dir, f"{nct_id}.json")
+
+    def _load(self, nct_id):
+        try:
+            with open(self._path(nct_id), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    # Return the stored entry for nct_id, fresh or not, or None if it is
+    # missing. A study stored with a fields projection only satisfies lookups
+    # for that same projection, while a full study satisfies any lookup.
+    def entry(self, nct_id, fields=None):
+        entry = self._load(nct_id)
+        if entry is None:
+            return None
+
+        stored_fields = entry.get("fields")
+        if stored_fields is not None and stored_fields != (list(fields) if fields else None):
+            return None
+        return entry
+
+    def is_fresh(self, entry):
+        return self.ttl is None or time.time() - entry.get("fetched", 0) <= self.ttl
+
+    # Return the cached study for nct_id, or None if it is missing or expired
+    def get(self, nct_id, fields=None):
+        entry = self.entry(nct_id, fields)
+        if entry is None or not self.is_fresh(entry):
+            return None
+
+        # Mark the entry as recently used so eviction keeps it
+        try:
+            os.utime(self._path(nct_id))
+        except OSError:
+            pass
+        return entry["study"]
+
+    # Store a study, replacing any previous entry atomically. `validators`
+    # holds what a later revalidation compares: "etag", "lastModified" and
+    # "updated" (the study's last update date), each optional.
+    def put(self, nct_id, study, fields=None, validators=None):
+        self._write({
+            "nctId": nct_id,
+            "fetched": time.time(),
+            "fields": list(fields) if fields else None,
+            "validators": validators or {},
+            "study": study,
+        })
+        self._evict()
+
+    def _write(self, entry):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._path(entry["nctId"])
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+
+    # Function to mark a stored entry as just revalidated (fresh for another
+    # ttl) or, with fetched=0, as expired so the next lookup revalidates it
+    def restamp(self, nct_id, fetched=None):
+        entry = self._load(nct_id)
+        if entry is None:
+            return
+        entry["fetched"] = time.time() if fetched is None else fetched
+        self._write(entry)
+
+    def delete(self, nct_id):
+        try:
+            os.remove(self._path(nct_id))
+        except OSError:
+            pass
+
+    def clear(self):
+        for name in self._entries():
+            self.delete(name[:-len(".json")])
+
+    def _entries(self):
+        try:
+            return [name for name in os.listdir(self.cache_dir) if name.endswith(".json")]
+        except OSError:
+            return []
+
+    # Drop the least recently used entries once the cache grows past max_entries
+    def _evict(self):
+        if self.max_entries is None:
+            return
+        names = self._entries()
+        if len(names) <= self.max_entries:
+            return
+
+        def last_used(name):
+            try:
+                return os.path.getmtime(os.path.join(self.cache_dir, name))
+            except OSError:
+                return 0
+
+        names.sort(key=last_used)
+        for name in names[:len(names) - self.max_entries]:
+            self.delete(name[:-len(".json")])
@@ -0,0 +1,211 @@
+import argparse
+import json
+import os
+import sys
+
+# Gene -> NCT ID lists shipped with the repository
+DATA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "genes.json")
+STUDY_LINK = "https://clinicaltrials.gov/study/{}"
+RUN_LOG_NAME = "run_log.jsonl"  # per-stage timings and counters, in --out
+
+# Per-provider defaults; adjust the rate budget to your account's tier
+PROVIDER_SETTINGS = {
+    "gemini": {"model": "gemini-1.5-pro", "rpm": 360, "tpm": 4000000, "folder": "clinical_trials_custom_links_gemini"},
+    "openai": {"model": "gpt-4o", "rpm": 500, "tpm": 30000, "folder": "clinical_trials_custom_links_gpt"},
+}
+
+
+# Function to load {gene: [study links]} from the gene data file
+def load_gene_lists(path=DATA_FILE):
+    with open(path, encoding="utf-8") as f:
+        return {gene: [STUDY_LINK.format(nct_id) for nct_id in nct_ids] for gene, nct_ids in json.load(f).items()}
+
+
+# Function to open the --record/--replay archive and route every study
+# download through it. The study and answer caches are moved to a fresh
+# temporary folder, so each call really goes through the archive and a
+# replayed run does not depend on what this machine has cached.
+def open_archive(args):
+    import tempfile
+
+    import answers
+    import clinicaltrials
+    from replay import Archive
+
+    latency = args.replay_latency if args.replay_latency == "recorded" else float(args.replay_latency)
+    archive = Archive(args.record or args.replay, "record" if args.record else "replay", latency)
+    clinicaltrials.http_archive = archive
+    cache_dir = tempfile.mkdtemp(prefix="trials_archive_")
+    clinicaltrials.study_cache.cache_dir = os.path.join(cache_dir, "studies")
+    answers.answer_cache.cache_dir = os.path.join(cache_dir, "answers")
+    return archive
+
+
+# Function to run the pipeline for the selected genes. With several providers
+# each trial is fetched once and answered by all of them concurrently.
+def run(args):
+    # Imported here so `--help` does not pay for requests, python-docx or the SDKs
+    from pipeline import Target
+    from providers import get_provider
+
+    gene_lists = load_gene_lists(args.data)
+    genes = args.genes.split(",") if args.genes else list(gene_lists)
+    unknown = [gene for gene in genes if gene not in gene_lists]
+    if unknown:
+        sys.exit(f"Unknown gene(s): {', '.join(unknown)}. Known: {', '.join(gene_lists)}")
+
+    provider_names = args.provider.split(",")
+    unknown = [name for name in provider_names if name not in PROVIDER_SETTINGS]
+    if unknown:
+        sys.exit(f"Unknown provider(s): {', '.join(unknown)}. Known: {', '.join(PROVIDER_SETTINGS)}")
+    if args.batch:
+        from providers import PROVIDERS
+        unsupported = [name for name in provider_names if not hasattr(PROVIDERS[name], "submit_batch")]
+        if unsupported:
+            sys.exit(f"--batch is not supported by provider(s): {', '.join(unsupported)}")
+    if args.model and len(provider_names) > 1:
+        sys.exit("--model can only be used with a single provider")
+    if args.record and args.replay:
+        sys.exit("--record and --replay cannot be combined")
+    archive = None
+    if args.record or args.replay:
+        if args.batch:
+            sys.exit("--record and --replay do not support --batch")
+        archive = open_archive(args)
+
+    targets = []
+    for name in provider_names:
+        settings = PROVIDER_SETTINGS[name]
+        provider_options = {} if args.context_tokens is None else {"context_tokens": args.context_tokens}
+        provider = get_provider(name, model=args.model or settings["model"], **provider_options)
+        if archive is not None:
+            from replay import ArchiveProvider
+            provider = ArchiveProvider(provider, archive)
+        targets.append(Target(provider, os.path.join(args.out, settings["folder"]), args.workers,
+                              args.rpm or settings["rpm"], args.tpm or settings["tpm"], args.prescreen))
+
+    from metrics import metrics
+    os.makedirs(args.out, exist_ok=True)
+    metrics.open_log(args.run_log or os.path.join(args.out, RUN_LOG_NAME))
+    server = metrics.serve(args.metrics_port) if args.metrics_port else None
+    if server is not None:
+        print(f"Serving metrics at http://127.0.0.1:{args.metrics_port}/metrics")
+    profiler = None
+    if args.profile:
+        from profiling import PROFILE_SUFFIX, Profiler
+        profiler = Profiler(os.path.abspath(args.out) + PROFILE_SUFFIX)
+        print(f"Profiling into {profiler.folder} (the run is slower than usual)")
+        profiler.start()
+    try:
+        return run_genes(args, targets, gene_lists, genes)
+    finally:
+        if profiler is not None:
+            profiler.stop()
+            profiler.print_summary()
+        if archive is not None:
+            responses, answers = archive.counts()
+            print(f"Archive {archive.path}: {responses} responses, {answers} answers, {archive.misses} misses")
+            archive.close()
+        metrics.print_summary()
+        metrics.close_log()
+        if server is not None:
+            server.shutdown()
+
+
+# Function to plan the run and then run every selected gene list
+def run_genes(args, targets, gene_lists, genes):
+    import profiling
+    from pipeline import run_targets
+    from planner import plan_run, print_plan
+
+    # Every study is fetched and extracted once for all genes, and the model
+    # work is counted, before the first paid call
+    fetch_options = {"fetch_workers": args.fetch_workers} if args.fetch_workers else {}
+    plan = plan_run(targets, {gene: gene_lists[gene] for gene in genes}, args.multi_gene, not args.no_resume,
+                    bulk=not args.no_bulk, revalidate=args.revalidate, **fetch_options)
+    print_plan(plan)
+    profiling.checkpoint("plan")
+    if args.plan:
+        return 0
+
+    if args.report:
+        from reports import RunReports
+        for target in targets:
+            target.reports = RunReports(target.folder_path, args.file_prefix, args.results_format)
+    trial_genes = plan.trial_genes if args.multi_gene else None
+
+    pipeline_options = {"batch": args.batch, "resume": not args.no_resume, "entries": plan.entries, **fetch_options}
+    if args.render_workers:
+        pipeline_options["render_workers"] = args.render_workers
+
+    try:
+        for gene in genes:
+            run_targets(targets, gene_lists[gene], args.file_prefix, gene, gene, trial_genes, **pipeline_options)
+            profiling.checkpoint(gene)
+    finally:
+        for target in targets:
+            if target.reports is not None:
+                target.reports.close()
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="trials", description="Ask LLMs whether gene-mutation patients are "
+                                                                "eligible for ClinicalTrials.gov studies.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="fetch trials, ask the model and write one .docx per trial")
+    run_parser.add_argument("--provider", required=True,
+                            help=f"provider, or comma-separated providers sharing one fetch "
+                                 f"({', '.join(PROVIDER_SETTINGS)})")
+    run_parser.add_argument("--genes", help="comma-separated genes to run (default: all in the data file)")
+    run_parser.add_argument("--out", default=".", help="folder that receives the per-provider output folders")
+    run_parser.add_argument("--workers", type=int, default=8, help="model calls in flight (default: 8)")
+    run_parser.add_argument("--fetch-workers", type=int, help="concurrent study downloads")
+    run_parser.add_argument("--render-workers", type=int, help="processes building .docx files (default: CPU count)")
+    run_parser.add_argument("--model", help="model name (default depends on the provider)")
+    run_parser.add_argument("--rpm", type=int, help="requests-per-minute budget")
+    run_parser.add_argument("--tpm", type=int, help="tokens-per-minute budget")
+    run_parser.add_argument("--context-tokens", type=int,
+                            help="token budget of the eligibility text in each prompt (default: 3000, 0 for no limit)")
+    run_parser.add_argument("--data", default=DATA_FILE, help="JSON file mapping genes to NCT IDs")
+    run_parser.add_argument("--file-prefix", default="clinical_trials")
+    run_parser.add_argument("--batch", action="store_true", help="send questions through the provider's batch API")
+    run_parser.add_argument("--multi-gene", action="store_true",
+                            help="ask about all of a trial's genes in one model call")
+    run_parser.add_argument("--report", action="store_true",
+                            help="also write one .docx per gene with a contents list and a results file")
+    run_parser.add_argument("--results-format", choices=["csv", "jsonl"], default="csv",
+                            help="format of the --report results file (default: csv)")
+    run_parser.add_argument("--prescreen", action="store_true",
+                            help="answer trials that never mention the gene, or plainly require or exclude it, "
+                                 "without the model")
+    run_parser.add_argument("--record", metavar="ARCHIVE",
+                            help="record every study download and model answer into this SQLite file")
+    run_parser.add_argument("--replay", metavar="ARCHIVE",
+                            help="serve downloads and answers from a --record archive, without network")
+    run_parser.add_argument("--replay-latency", default="0",
+                            help="seconds each replayed call takes, or 'recorded' (default: 0)")
+    run_parser.add_argument("--run-log", help=f"JSON-lines metrics log (default: {RUN_LOG_NAME} in --out)")
+    run_parser.add_argument("--metrics-port", type=int,
+                            help="serve Prometheus metrics at http://127.0.0.1:PORT/metrics during the run")
+    run_parser.add_argument("--profile", action="store_true",
+                            help="profile the run (cProfile and tracemalloc per stage) into OUT-profile")
+    run_parser.add_argument("--plan", action="store_true",
+                            help="print the work plan (studies, cached answers, model calls, tokens) and stop")
+    run_parser.add_argument("--no-bulk", action="store_true",
+                            help="download studies with one GET each instead of /studies list queries")
+    run_parser.add_argument("--revalidate", action="store_true",
+                            help="check every cached study for updates (one small listing query per 100 studies) "
+                                 "and redo only the trials whose study changed")
+    run_parser.add_argument("--no-resume", action="store_true", help="redo trials completed in an earlier run")
+    run_parser.set_defaults(func=run)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())